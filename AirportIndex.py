@@ -0,0 +1,320 @@
+# AirportIndex.py - spatial index over airport locations for nearest-airport queries
+#
+# Each airport is stored as a unit vector on the sphere in a k-d tree.  The straight-line (chord)
+# distance between two unit vectors grows monotonically with their great-circle distance,
+# so a best-first walk of the tree using chord distances returns airports in increasing
+# great-circle distance order without looking at most of the airports.
+#
+# Each tree node also remembers the longest runway found underneath it, so queries for
+# "airports with a runway >= N ft" can skip whole subtrees.
+#
+import heapq
+from math import sin, cos, sqrt
+import Geodesic
+from Geodesic import DEG_TO_RAD, R, NM_TO_METER
+import AirportStore
+
+LEAF_SIZE = 16                  # max airports in a leaf node
+
+def latlon_to_vector( lat, lon ):
+    p = lat * DEG_TO_RAD
+    l = lon * DEG_TO_RAD
+    cp = cos( p )
+    return (cp*cos( l ), cp*sin( l ), sin( p ))
+
+def nm_to_chord( nm ):
+    a = nm * NM_TO_METER / R                    # angular distance
+    if a >= Geodesic.PI: return 2.0
+    return 2.0 * sin( a * 0.5 )
+
+def build( rawdata, types=['AIRPORT'] ):
+    if isinstance( rawdata, AirportStore.AirportStore ):
+        # read the columns straight from the store without decoding any records
+        lats    = rawdata.column( 'lat' )
+        lons    = rawdata.column( 'lon' )
+        lengths = rawdata.column( 'length' )
+        elevations = rawdata.column( 'elevation' )
+        keep = [ i for i, t in enumerate( rawdata.column( 'type' ) ) if t in types ]
+        return build_from_columns( [ rawdata.id_at( i ) for i in keep ], [ lats[i] for i in keep ],
+                                   [ lons[i] for i in keep ], [ lengths[i] for i in keep ], [ elevations[i] for i in keep ] )
+    ids     = []
+    lats    = []
+    lons    = []
+    lengths = []
+    elevations = []
+    for id in rawdata:
+        info = rawdata[id]
+        if info['type'] not in types: continue
+        longest = AirportStore.runway_summary( info )['longest']
+        ids.append( id )
+        lats.append( info['lat'] )
+        lons.append( info['lon'] )
+        lengths.append( info['runways'][longest]['length'] if longest >= 0 else 0 )
+        elevations.append( info['elevation'] )
+    return build_from_columns( ids, lats, lons, lengths, elevations )
+
+def build_from_columns( ids, lats, lons, lengths, elevations ):
+    #--------------------------------------------------------------
+    # The tree is kept in flat lists indexed by node number.
+    # Leaves own the slice [lo, hi) of the permuted point order.
+    # Internal nodes have children left/right and no points.
+    #--------------------------------------------------------------
+    n = len( ids )
+    pts = [ latlon_to_vector( lats[i], lons[i] ) for i in range(n) ]
+    xyz = [ [ p[a] for p in pts ] for a in range(3) ]  # per-axis coordinates for sorting
+    index = { 'ids':     ids,
+              'lats':    lats,
+              'lons':    lons,
+              'lengths': lengths,
+              'elevations': elevations,
+              'elevation_min': min( elevations, default=0 ),   # bounds how far anything can glide to an airport
+              'pts':     pts,
+              'xyz':     xyz,
+              'order':   list( range(n) ),
+              'lo':      [],
+              'hi':      [],
+              'left':    [],
+              'right':   [],
+              'bmin':    [],
+              'bmax':    [],
+              'maxlen':  [] }
+    if n > 0: build_node( index, 0, n )
+    return index
+
+def build_node( index, lo, hi ):
+    # bounds come from the points in a leaf and from the children otherwise
+    xyz   = index['xyz']
+    order = index['order']
+    node = len( index['lo'] )
+    index['lo'].append( lo )
+    index['hi'].append( hi )
+    index['left'].append( -1 )
+    index['right'].append( -1 )
+    index['bmin'].append( None )
+    index['bmax'].append( None )
+    index['maxlen'].append( 0 )
+    members = order[lo:hi]
+    if hi - lo <= LEAF_SIZE:
+        bmin = []
+        bmax = []
+        for a in range(3):
+            coords = [ xyz[a][i] for i in members ]
+            bmin.append( min( coords ) )
+            bmax.append( max( coords ) )
+        maxlen = max( index['lengths'][i] for i in members )
+    else:
+        # split on the axis with the largest spread, judged from a sample of the points
+        sample = members[::max( 1, len( members ) >> 6 )]
+        axis = 0
+        spread = -1.0
+        for a in range(3):
+            coords = [ xyz[a][i] for i in sample ]
+            d = max( coords ) - min( coords )
+            if d > spread:
+                spread = d
+                axis = a
+        order[lo:hi] = sorted( members, key=xyz[axis].__getitem__ )
+        mid = (lo + hi) >> 1
+        left  = build_node( index, lo, mid )
+        right = build_node( index, mid, hi )
+        index['left'][node]  = left
+        index['right'][node] = right
+        lmin = index['bmin'][left]
+        lmax = index['bmax'][left]
+        rmin = index['bmin'][right]
+        rmax = index['bmax'][right]
+        bmin = [ min( lmin[a], rmin[a] ) for a in range(3) ]
+        bmax = [ max( lmax[a], rmax[a] ) for a in range(3) ]
+        maxlen = max( index['maxlen'][left], index['maxlen'][right] )
+    index['bmin'][node] = bmin
+    index['bmax'][node] = bmax
+    index['maxlen'][node] = maxlen
+    return node
+
+def box_chord2( index, node, v ):
+    # squared distance from v to the node's bounding box (0 if inside)
+    bmin = index['bmin'][node]
+    bmax = index['bmax'][node]
+    d2 = 0.0
+    for a in range(3):
+        if v[a] < bmin[a]:
+            d = bmin[a] - v[a]
+            d2 += d*d
+        elif v[a] > bmax[a]:
+            d = v[a] - bmax[a]
+            d2 += d*d
+    return d2
+
+def nearest( index, lat, lon, runway_length_min=0, max_nm=None, points=False ):
+    #--------------------------------------------------------------
+    # Generator that yields (distance_nm, id) for airports with a runway
+    # >= runway_length_min, closest first, out to max_nm (if given).
+    # Callers may stop iterating as soon as they have what they need.
+    # With points=True, it yields index point numbers instead of ids.
+    #--------------------------------------------------------------
+    if len( index['lo'] ) == 0: return
+    v = latlon_to_vector( lat, lon )
+    max_c2 = 4.0 if max_nm is None else nm_to_chord( max_nm )**2
+    pts     = index['pts']
+    order   = index['order']
+    lengths = index['lengths']
+    heap = [ (box_chord2( index, 0, v ), 0, 0) ]       # (chord^2, is_point, node or point)
+    while len( heap ) > 0:
+        c2, is_point, k = heapq.heappop( heap )
+        if c2 > max_c2: return
+        if is_point:
+            yield (Geodesic.distance( lat, lon, index['lats'][k], index['lons'][k] ), k if points else index['ids'][k])
+            continue
+        left = index['left'][k]
+        if left < 0:
+            for j in range(index['lo'][k], index['hi'][k]):
+                i = order[j]
+                if lengths[i] < runway_length_min: continue
+                p = pts[i]
+                dx = p[0] - v[0]
+                dy = p[1] - v[1]
+                dz = p[2] - v[2]
+                heapq.heappush( heap, (dx*dx + dy*dy + dz*dz, 1, i) )
+        else:
+            for child in [left, index['right'][k]]:
+                if index['maxlen'][child] < runway_length_min: continue
+                heapq.heappush( heap, (box_chord2( index, child, v ), 0, child) )
+
+def k_nearest( index, lat, lon, k, runway_length_min=0, max_nm=None ):
+    found = []
+    for dist, id in nearest( index, lat, lon, runway_length_min, max_nm ):
+        if len( found ) == k: break
+        found.append( (dist, id) )
+    return found
+
+# Corridor
+#
+# Airports along a leg: the great circle from (lat1, lon1) to (lat2, lon2) has unit normal n, and
+# a point p is dxt = asin( p.n ) * R across the track, so p.n bounds the cross-track distance of a
+# whole node box at once.  Together with a ball around the middle of the leg that holds the whole
+# corridor, that skips the boxes that can't have anything within width_nm of the leg.  The
+# airports left are measured with Geodesic.cross_track_distance() and along_track_distance().
+#
+def cross( u, v ):
+    return (u[1]*v[2] - u[2]*v[1], u[2]*v[0] - u[0]*v[2], u[0]*v[1] - u[1]*v[0])
+
+def normalize( u ):
+    m = sqrt( u[0]*u[0] + u[1]*u[1] + u[2]*u[2] )
+    return (u[0]/m, u[1]/m, u[2]/m)
+
+def box_dot_range( index, node, n ):
+    # smallest and largest p.n over the node's bounding box
+    bmin = index['bmin'][node]
+    bmax = index['bmax'][node]
+    lo = 0.0
+    hi = 0.0
+    for a in range(3):
+        x = n[a]*bmin[a]
+        y = n[a]*bmax[a]
+        if x < y:
+            lo += x
+            hi += y
+        else:
+            lo += y
+            hi += x
+    return (lo, hi)
+
+def corridor( index, lat1, lon1, lat2, lon2, width_nm, runway_length_min=0 ):
+    #--------------------------------------------------------------
+    # Returns [(along_nm, abeam_nm, distance_nm, id)] sorted by along_nm for
+    # the airports with a runway >= runway_length_min that are within width_nm
+    # of the leg, including past either end.  along_nm is from the start of the
+    # leg (negative before it), abeam_nm is the signed cross-track distance
+    # (positive = right of track), and distance_nm is to the nearest point of the leg.
+    #--------------------------------------------------------------
+    ids = index['ids']
+    return [ (at, xt, dist, ids[i]) for at, xt, dist, i in corridor_points( index, lat1, lon1, lat2, lon2, width_nm, runway_length_min ) ]
+
+def corridor_points( index, lat1, lon1, lat2, lon2, width_nm, runway_length_min=0 ):
+    # same as corridor(), but with index point numbers instead of ids
+    found = []
+    if len( index['lo'] ) == 0: return found
+    D = Geodesic.distance( lat1, lon1, lat2, lon2 )
+    v1 = latlon_to_vector( lat1, lon1 )
+    v2 = latlon_to_vector( lat2, lon2 )
+    n = cross( v1, v2 )
+    if n[0]*n[0] + n[1]*n[1] + n[2]*n[2] < 1e-24:
+        # no track to speak of, so just a circle
+        for dist, id in nearest( index, lat1, lon1, runway_length_min, width_nm, points=True ):
+            found.append( (0.0, 0.0, dist, id) )
+        return found
+    n = normalize( n )
+    c = normalize( (v1[0]+v2[0], v1[1]+v2[1], v1[2]+v2[2]) )
+    band = sin( min( width_nm * NM_TO_METER / R, Geodesic.PI/2 ) )
+    ball_c2 = nm_to_chord( D/2 + width_nm )**2
+    a12 = Geodesic.initial_bearing( lat1, lon1, lat2, lon2 ) * DEG_TO_RAD
+    pts     = index['pts']
+    order   = index['order']
+    lengths = index['lengths']
+    stack = [ 0 ]
+    while len( stack ) > 0:
+        k = stack.pop()
+        if index['maxlen'][k] < runway_length_min: continue
+        lo, hi = box_dot_range( index, k, n )
+        if lo > band or hi < -band: continue
+        if box_chord2( index, k, c ) > ball_c2: continue
+        left = index['left'][k]
+        if left >= 0:
+            stack.append( left )
+            stack.append( index['right'][k] )
+            continue
+        for j in range(index['lo'][k], index['hi'][k]):
+            i = order[j]
+            if lengths[i] < runway_length_min: continue
+            p = pts[i]
+            pn = p[0]*n[0] + p[1]*n[1] + p[2]*n[2]
+            if pn > band or pn < -band: continue
+            lat = index['lats'][i]
+            lon = index['lons'][i]
+            d13 = Geodesic.distance( lat1, lon1, lat, lon )
+            a13 = Geodesic.initial_bearing( lat1, lon1, lat, lon ) * DEG_TO_RAD
+            xt  = Geodesic.cross_track_distance( d13, a13, a12 )
+            at  = Geodesic.along_track_distance( d13, xt )
+            if cos( a13 - a12 ) < 0: at = -at
+            if at < 0:
+                dist = d13
+            elif at > D:
+                dist = Geodesic.distance( lat2, lon2, lat, lon )
+            else:
+                dist = abs( xt )
+            if dist <= width_nm: found.append( (at, xt, dist, i) )
+    found.sort()
+    return found
+
+# Sweep
+#
+# Airports around each of a series of points along a leg, e.g., every mile.  The leg's corridor
+# is looked up once, sorted by along-track position, and each point only looks at the window of
+# it that is within width_nm along the leg.  The window slides forward from point to point, so
+# each airport enters and leaves it once.  Nothing within width_nm of a point can be outside its
+# window, because in the right spherical triangle cos(d) = cos(xt)*cos(along-s), so a point
+# s along the leg is at least |along-s| from any airport.
+#
+def sweep( index, lat1, lon1, lat2, lon2, alongs, plats, plons, width_nm, runway_length_min=0, points=False ):
+    #--------------------------------------------------------------
+    # Generator that yields, for each point (plats[k], plons[k]) that is alongs[k]
+    # nm along the leg (increasing), the list of (distance_nm, id) for the airports
+    # within width_nm of it, closest first.  Airports farther than width_nm are
+    # not in the list, so a caller that needs more than that must ask nearest().
+    # With points=True, the lists have index point numbers instead of ids.
+    #--------------------------------------------------------------
+    cands = corridor_points( index, lat1, lon1, lat2, lon2, width_nm, runway_length_min )
+    ids  = index['ids']
+    lats = index['lats']
+    lons = index['lons']
+    lo = 0
+    hi = 0
+    pad = width_nm + 1e-6
+    for s, plat, plon in zip( alongs, plats, plons ):
+        while hi < len( cands ) and cands[hi][0] <= s + pad: hi += 1
+        while lo < hi and cands[lo][0] < s - pad: lo += 1
+        window = [ c[3] for c in cands[lo:hi] ]
+        dists = Geodesic.distance_many( plat, plon, [ lats[i] for i in window ], [ lons[i] for i in window ] )
+        found = [ (d, i if points else ids[i]) for d, i in zip( dists, window ) if d <= width_nm ]
+        found.sort()
+        yield found
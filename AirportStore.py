@@ -0,0 +1,245 @@
+# AirportStore.py - columnar, memory-mapped airport store
+#
+# rawdata/make_rawdata.py writes this next to rawdata.dat.  Instead of one big pickle,
+# the file holds fixed-width columns for the fields that searches need (id, type, lat, lon,
+# elevation, longest runway length and surface), plus a blob with one small pickle per
+# airport that holds the complete record (runways, freqs, navaids, etc.).
+#
+# fp.py maps the file and looks at the columns directly.  A full record is only
+# unpickled when somebody asks for rawdata[id], which happens just for the airports
+# that end up in the plan.
+#
+# File layout:
+#
+#     magic               8 bytes
+#     catalog offset      uint64
+#     catalog length      uint64
+#     columns             each starts on an 8-byte boundary, see COLUMNS
+#     detail blob         concatenated pickles, one per airport
+#     catalog             pickle with n, column offsets, type and surface names, byte order
+#
+# Rows are sorted by id so lookups are a binary search over the id column.
+#
+import sys
+import mmap
+import pickle
+import struct
+from array import array
+from collections.abc import Mapping
+
+MAGIC    = b'FPSTORE1'
+HEADER   = '<8sQQ'
+ID_WIDTH = 8
+
+# name, array typecode ('s' = fixed-width id string)
+#
+COLUMNS = [ ('id',        's'),
+            ('type',      'B'),
+            ('lat',       'd'),
+            ('lon',       'd'),
+            ('elevation', 'i'),
+            ('length',    'i'),     # longest runway length (0 if none)
+            ('surface',   'B'),     # longest runway condition, index into catalog['surfaces']
+            ('detail',    'q') ]    # n+1 offsets into the detail blob
+
+#--------------------------------------------------------------
+# Runway summary
+#
+# make_rawdata.py stores this with each record as info['runway_summary'] so
+# readers don't have to work it out from the runways over and over:
+#
+#     longest, longest_hard, longest_turf    index into info['runways'] (-1 = none)
+#     headings    [ (heading, heading), ... ]  both ends of each runway, e.g., '09/27' -> (90, 270)
+#     surfaces    [ code, ... ]                each runway's surface code, see surface_code()
+#     public      open to the public
+#     towered     has a control tower
+#
+# Stores written before there was a summary don't have it, so use runway_summary( info ),
+# which works it out when it isn't there.
+#--------------------------------------------------------------
+SURFACE_CODES = { 'ASPH': 'A', 'CONC': 'C', 'PEM': 'P', 'TURF': 'T', 'GRAVEL': 'G', 'GRVL': 'G', 'DIRT': 'D',
+                  'WATER': 'W', 'SNOW': 'S', 'ICE': 'I', 'MATS': 'M', 'TREATED': 'R', 'ROOFTOP': 'O' }
+HARD_SURFACES = 'ACP'
+TURF_SURFACES = 'T'
+SURFACE_CONDITIONS = [ 'E', 'G', 'F', 'P', 'L' ]   # excellent, good, fair, poor, failed
+COMPASS_HEADINGS = { 'N': 360, 'NE': 45, 'E': 90, 'SE': 135, 'S': 180, 'SW': 225, 'W': 270, 'NW': 315 }
+
+def surface_code( condition ):
+    # 'ASPH-G' -> 'A', 'ASPH-TURF' -> 'AT', unknown surfaces are '?'
+    return ''.join( SURFACE_CODES.get( s, '?' ) for s in condition.split( '-' ) if s != '' and s not in SURFACE_CONDITIONS )
+
+def runway_headings( id ):
+    # '09/27' -> (90, 270), '05L/23R' -> (50, 230), 'N/S' -> (360, 180); ends without a heading (e.g., 'H1') are None
+    ends = id.split( '/' )
+    headings = []
+    for end in ends[:2]:
+        end = end.strip()
+        number = end.rstrip( 'LRCWSTGU' )
+        if number.isdigit() and 1 <= int( number ) <= 36:
+            headings.append( int( number ) * 10 )
+        else:
+            headings.append( COMPASS_HEADINGS.get( end ) )
+    while len( headings ) < 2: headings.append( None )
+    return tuple( headings )
+
+def make_runway_summary( info ):
+    runways  = info['runways']
+    surfaces = [ surface_code( r['condition'] ) for r in runways ]
+    def longest( ok ):
+        best = -1
+        for i in range(len(runways)):
+            if ok( surfaces[i] ) and (best < 0 or runways[i]['length'] > runways[best]['length']): best = i
+        return best
+    return { 'longest':      longest( lambda s: True ),
+             'longest_hard': longest( lambda s: any( c in HARD_SURFACES for c in s ) ),
+             'longest_turf': longest( lambda s: any( c in TURF_SURFACES for c in s ) ),
+             'headings':     [ runway_headings( r['id'] ) for r in runways ],
+             'surfaces':     surfaces,
+             'public':       info['use'] == 'PU',
+             'towered':      info['atct'] if 'atct' in info else any( f['kind'].endswith( ' TOWER' ) for f in info['freqs'] ) }
+
+def runway_summary( info ):
+    return info['runway_summary'] if 'runway_summary' in info else make_runway_summary( info )
+
+def write( rawdata, path ):
+    ids = sorted( rawdata.keys() )
+    types    = []
+    surfaces = []
+    cols = { 'id': bytearray(), 'type': array( 'B' ), 'lat': array( 'd' ), 'lon': array( 'd' ),
+             'elevation': array( 'i' ), 'length': array( 'i' ), 'surface': array( 'B' ), 'detail': array( 'q' ) }
+    blob = bytearray()
+    for id in ids:
+        info = rawdata[id]
+        bid = id.encode( 'ascii' )
+        if len( bid ) > ID_WIDTH: raise ValueError( f'airport id too long for store: {id}' )
+        cols['id'] += bid.ljust( ID_WIDTH, b'\0' )
+        if info['type'] not in types: types.append( info['type'] )
+        cols['type'].append( types.index( info['type'] ) )
+        cols['lat'].append( info['lat'] )
+        cols['lon'].append( info['lon'] )
+        cols['elevation'].append( info['elevation'] )
+        i = runway_summary( info )['longest']
+        longest = info['runways'][i] if i >= 0 else None
+        surface = longest['condition'] if longest else ''
+        if surface not in surfaces: surfaces.append( surface )
+        cols['length'].append( longest['length'] if longest else 0 )
+        cols['surface'].append( surfaces.index( surface ) )
+        cols['detail'].append( len( blob ) )
+        blob += pickle.dumps( info, protocol=pickle.HIGHEST_PROTOCOL )
+    cols['detail'].append( len( blob ) )
+    if len( types ) > 256 or len( surfaces ) > 256: raise ValueError( 'too many distinct types or surfaces for store' )
+
+    out = open( path, 'wb' )
+    out.write( struct.pack( HEADER, MAGIC, 0, 0 ) )
+    offsets = {}
+    for name, typecode in COLUMNS:
+        pad = -out.tell() % 8
+        out.write( b'\0' * pad )
+        offsets[name] = out.tell()
+        out.write( cols[name] if typecode == 's' else cols[name].tobytes() )
+    offsets['blob'] = out.tell()
+    out.write( blob )
+    catalog = pickle.dumps( { 'n':          len( ids ),
+                              'offsets':    offsets,
+                              'types':      types,
+                              'surfaces':   surfaces,
+                              'byteorder':  sys.byteorder } )
+    catalog_offset = out.tell()
+    out.write( catalog )
+    out.seek( 0 )
+    out.write( struct.pack( HEADER, MAGIC, catalog_offset, len( catalog ) ) )
+    out.close()
+
+class AirportStore( Mapping ):
+    # Read-only dict-like view of the store: store[id] returns the same record dict
+    # that rawdata.dat would have, decoded on first use and then remembered.
+
+    def __init__( self, path ):
+        f = open( path, 'rb' )
+        self.mm = mmap.mmap( f.fileno(), 0, access=mmap.ACCESS_READ )
+        f.close()
+        magic, catalog_offset, catalog_length = struct.unpack_from( HEADER, self.mm, 0 )
+        if magic != MAGIC: raise ValueError( f'{path} is not an airport store' )
+        catalog = pickle.loads( self.mm[catalog_offset:catalog_offset+catalog_length] )
+        if catalog['byteorder'] != sys.byteorder: raise ValueError( f'{path} was written with {catalog["byteorder"]}-endian byte order' )
+        self.n        = catalog['n']
+        self.types    = catalog['types']
+        self.surfaces = catalog['surfaces']
+        self.blob     = catalog['offsets']['blob']
+        self.id_off   = catalog['offsets']['id']
+        self.cols     = {}
+        mv = memoryview( self.mm )
+        for name, typecode in COLUMNS:
+            off = catalog['offsets'][name]
+            if typecode == 's':
+                self.cols[name] = mv[off:off+self.n*ID_WIDTH]
+            else:
+                cnt = self.n+1 if name == 'detail' else self.n
+                self.cols[name] = mv[off:off+cnt*array( typecode ).itemsize].cast( typecode )
+        self.records = {}
+
+    def id_at( self, i ):
+        off = self.id_off + i*ID_WIDTH
+        return self.mm[off:off+ID_WIDTH].rstrip( b'\0' ).decode( 'ascii' )
+
+    def find( self, id ):
+        # row number of id, or -1
+        try:
+            key = id.encode( 'ascii' ).ljust( ID_WIDTH, b'\0' )
+        except (UnicodeEncodeError, AttributeError):
+            return -1
+        mm  = self.mm
+        off = self.id_off
+        lo = 0
+        hi = self.n
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if mm[off+mid*ID_WIDTH:off+(mid+1)*ID_WIDTH] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n and mm[off+lo*ID_WIDTH:off+(lo+1)*ID_WIDTH] == key: return lo
+        return -1
+
+    def column( self, name ):
+        # 'type' and 'surface' come back as names, the rest as their stored numbers
+        col = self.cols[name]
+        if name == 'id':      return [ self.id_at( i ) for i in range(self.n) ]
+        if name == 'type':    return [ self.types[t] for t in col ]
+        if name == 'surface': return [ self.surfaces[s] for s in col ]
+        if name == 'detail':  return col[:self.n]
+        return col
+
+    def record( self, i ):
+        id = self.id_at( i )
+        if id not in self.records:
+            lo = self.blob + self.cols['detail'][i]
+            hi = self.blob + self.cols['detail'][i+1]
+            self.records[id] = pickle.loads( self.mm[lo:hi] )
+        return self.records[id]
+
+    def __getitem__( self, id ):
+        # records already decoded don't need the search (e.g., diversions keep coming back to the same airports)
+        if id in self.records: return self.records[id]
+        i = self.find( id )
+        if i < 0: raise KeyError( id )
+        return self.record( i )
+
+    def __contains__( self, id ):
+        return self.find( id ) >= 0
+
+    def __iter__( self ):
+        for i in range(self.n): yield self.id_at( i )
+
+    def __len__( self ):
+        return self.n
+
+def load( dir='rawdata' ):
+    # prefer the columnar store, fall back to the pickle for older checkouts
+    try:
+        return AirportStore( f'{dir}/rawdata.col' )
+    except FileNotFoundError:
+        f = open( f'{dir}/rawdata.dat', 'rb' )
+        rawdata = pickle.load( f )
+        f.close()
+        return rawdata
@@ -1,6 +1,7 @@
 # Python translation of http://www.movable-type.co.uk/scripts/latlong.html
 #
 from math import pi,sqrt,sin,cos,tan,asin,acos,atan2
+from array import array
 
 # Constants
 #
@@ -169,7 +170,7 @@ def destination( lat1, lon1, a, d, in_nm ):
     sb  = sin( a )
     cb  = cos( a )
     p2  = asin( s1*cd + c1*sd*cb )
-    l2  = l1 + atan2( sb*sd*c1, cd - s1*cos( p2 ) )
+    l2  = l1 + atan2( sb*sd*c1, cd - s1*sin( p2 ) )
 
     lat2 = p2*RAD_TO_DEG
     lon2 = (l2*RAD_TO_DEG + 540) % 360 - 180       # normalize to -180 .. +180
@@ -296,7 +297,7 @@ def along_track_distance( d13, dxt, in_nm=True ):
     if in_nm: 
         d13 *= NM_TO_METER
         dxt *= NM_TO_METER
-    dat = acos( cos( d13 ) / cos( dxt ) ) * R
+    dat = acos( min( 1.0, cos( d13 / R ) / cos( dxt / R ) ) ) * R
     if in_nm: dat *= METER_TO_NM
     return dat
 
@@ -312,3 +313,89 @@ def maximum_latitude( a, lat ):
     pmax = acos( abs( sin(a)*cos(p) ) )
     latmax = (pmax*RAD_TO_DEG + 360.0) % 360
     return latmax
+
+# Batch Versions
+#
+# These take one start point and sequences of other points (lists, array('d'), or the
+# columns of AirportStore) and return array('d') results, which are contiguous float64s.
+# They use the same formulas as the scalar versions above and return the same values,
+# but work out everything that depends only on the start point once per call
+# instead of once per point.
+#
+def distance_many( lat1, lon1, lats, lons, in_nm=True ):
+    cp1 = cos( lat1 * DEG_TO_RAD )
+    out = array( 'd' )
+    for lat2, lon2 in zip( lats, lons ):
+        s1 = sin( (lat2-lat1) * DEG_TO_RAD * 0.5 )
+        s2 = sin( (lon2-lon1) * DEG_TO_RAD * 0.5 )
+        a  = s1*s1 + cp1*cos( lat2 * DEG_TO_RAD ) * s2*s2
+        d  = R * 2.0 * atan2( sqrt( a ), sqrt( 1-a ) )
+        out.append( d * METER_TO_NM if in_nm else d )
+    return out
+
+def distance_matrix( lats1, lons1, lats2, lons2, in_nm=True ):
+    # one array('d') row per point in lats1/lons1 
+    cp2 = [ cos( lat2 * DEG_TO_RAD ) for lat2 in lats2 ]
+    rows = []
+    for lat1, lon1 in zip( lats1, lons1 ):
+        cp1 = cos( lat1 * DEG_TO_RAD )
+        row = array( 'd' )
+        for lat2, lon2, c2 in zip( lats2, lons2, cp2 ):
+            s1 = sin( (lat2-lat1) * DEG_TO_RAD * 0.5 )
+            s2 = sin( (lon2-lon1) * DEG_TO_RAD * 0.5 )
+            a  = s1*s1 + cp1*c2 * s2*s2
+            d  = R * 2.0 * atan2( sqrt( a ), sqrt( 1-a ) )
+            row.append( d * METER_TO_NM if in_nm else d )
+        rows.append( row )
+    return rows
+
+def initial_bearing_many( lat1, lon1, lats, lons ):
+    p1  = lat1 * DEG_TO_RAD
+    sp1 = sin( p1 )
+    cp1 = cos( p1 )
+    out = array( 'd' )
+    for lat2, lon2 in zip( lats, lons ):
+        p2  = lat2 * DEG_TO_RAD
+        dl  = (lon2-lon1) * DEG_TO_RAD
+        cp2 = cos( p2 )
+        y = sin( dl )*cp2
+        x = cp1*sin( p2 ) - sp1*cp2*cos( dl )
+        out.append( (atan2( y, x )*RAD_TO_DEG + 360.0) % 360 )
+    return out
+
+def destination_many( lat1, lon1, a, ds, in_nm ):
+    # points at each distance in ds along initial bearing a (radians), e.g. to densify a leg;
+    # returns (lats, lons)
+    p1  = lat1 * DEG_TO_RAD
+    l1  = lon1 * DEG_TO_RAD
+    s1  = sin( p1 )
+    c1  = cos( p1 )
+    sb  = sin( a )
+    cb  = cos( a )
+    lats = array( 'd' )
+    lons = array( 'd' )
+    for d in ds:
+        if d == 0.0:
+            lats.append( lat1 )
+            lons.append( lon1 )
+            continue
+        if in_nm: d *= NM_TO_METER
+        d  /= R
+        sd  = sin( d )
+        cd  = cos( d )
+        p2  = asin( s1*cd + c1*sd*cb )
+        l2  = l1 + atan2( sb*sd*c1, cd - s1*sin( p2 ) )
+        lats.append( p2*RAD_TO_DEG )
+        lons.append( (l2*RAD_TO_DEG + 540) % 360 - 180 )
+    return (lats, lons)
+
+def cross_track_distance_many( d13s, a13s, a12, in_nm=True ):
+    # d13s and a13s (radians) are usually distance_many() and initial_bearing_many()*DEG_TO_RAD
+    # from the start of the path to each point
+    out = array( 'd' )
+    for d13, a13 in zip( d13s, a13s ):
+        if in_nm: d13 *= NM_TO_METER
+        dxt = asin( sin( d13 / R )*sin( a13-a12 ) ) * R
+        if in_nm: dxt *= METER_TO_NM
+        out.append( dxt )
+    return out
@@ -0,0 +1,1133 @@
+# Planner.py - flight planning library
+#
+# Everything that fp.py computes, without the printing and without touching sys.argv:
+#
+#     planner = Planner.Planner( AirportStore.load( 'rawdata' ) )
+#     result  = planner.plan( { 'tail': 'N53587', 'row1_weight': 430, 'alt': 30.30, 'runway': 21,
+#                               'route': [ { 'ias': 80,  'fuel_gph': 12, 'wd': 250, 'ws': 5, 'oat': 32, 'p': 'KTTA' },
+#                                          { 'ias': 100, 'ia': 3000,                          'p': 'KBUY' } ] } )
+#
+# A plan spec has the same fields as the fp.py options, without the '-'.  Each route step works
+# like the options given before a -p: its checkpoint options stick for the steps that follow, and
+# a step without 'p' just changes them.  Top-level checkpoint options set their starting values.
+#
+# A Planner keeps what doesn't change from one plan to the next (airport data and its spatial
+# index, compiled aircraft, today's magnetic variation grid), so a long-running process pays for
+# those once.  Importing this module does nothing but define things.
+#
+# Problems with a spec raise PlanError.
+#
+import os
+import re
+from dataclasses import dataclass
+from datetime import date
+from bisect import bisect_left
+from math import sin,asin,cos,pow,sqrt,ceil
+import Aircraft
+import Geodesic
+from Geodesic import DEG_TO_RAD, RAD_TO_DEG
+import MagVar
+import AirportIndex
+import AirportStore
+import Table
+
+class PlanError( Exception ):
+    pass
+
+#--------------------------------------------------------------
+# Options and their defaults
+#--------------------------------------------------------------
+OPTIONS = {
+    't':                     'C172S',       # aircraft type
+    'tail':                  '',            # tail number ('' = use type)
+    'name':                  '<lat,lon>',   # name of checkpoint for lat,lon only
+    'ias':                   110,
+    'ia':                    0,             # indicated altitude (start on ground)
+    'alt':                   29.92,         # altimeter setting
+    'flaps':                 0,             # flaps setting in degrees
+    'wd':                    0,             # wind direction
+    'ws':                    0,             # wind speed
+    'oat':                   15,
+    'fuel_gal':              0,             # 0 = use fuel_gal_max for type
+    'fuel_gal_taxi':         0,             # 0 = use default fuel for startup+taxi
+    'fuel_gph':              0,             # 0 = use default GPH
+    'fuel_refill':           False,         # whether to refill before return flight
+    'fuel_time_left_min':    60,            # minimum fuel time left after landing (one hour)
+    'runway':                36,            # takeoff runway heading
+    'runway_return':         36,            # takeoff runway heading for return
+    'row1_weight':           190,           # assume 190lb pilot only
+    'row2_weight':           0,             # assume no passengers
+    'baggage1_weight':       0,             # assume nothing in baggage area 1
+    'baggage2_weight':       0,             # assume nothing in baggage area 2
+    'runway_length_min':     2500,          # minimum runway length for diversions
+    'diversion_step_nm':     0,             # diversions every this many nm along each leg (0 = at 25%, 50% and 75%)
+    'diversion_step_min':    0,             # or every this many minutes of ETE along each leg
+    'diversion_k':           1,             # diversions per checkpoint, best ETE first
+    'diversion_surface':     '',            # runway surfaces allowed, e.g., 'ASPH,CONC' or 'TURF' ('' = any)
+    'diversion_width_min':   0,             # minimum runway width for diversions
+    'diversion_public':      False,         # public-use diversion airports only
+    'diversion_tower':       '',            # 'towered' or 'ctaf' diversion airports only ('' = either)
+    'corridor_nm':           10,            # how far off the route to look for airports (corridor section)
+    'glide_step_nm':         1,             # how often to check glide reachability along the route (glide section)
+    'glide_margin_ft':       1000,          # height above the field to arrive with in a glide
+    'show_return':           True,          # show return route
+    'alternate':             [],            # alternate airports
+    'show_diversion_detail': False,         # whether to include diversion airports in the airport information
+    'route':                 [],            # route steps, see above
+}
+
+# options that each checkpoint takes from the steps before it
+#
+CHECKPOINT_OPTIONS = [ 'name', 'ias', 'ia', 'alt', 'flaps', 'wd', 'ws', 'oat', 'fuel_gph' ]
+
+def check_option( key, v ):
+    default = OPTIONS[key]
+    if isinstance( default, bool ):
+        ok = isinstance( v, (bool, int) )
+    elif isinstance( default, (int, float) ):
+        ok = Aircraft.is_number( v )
+    elif isinstance( default, str ):
+        ok = isinstance( v, str )
+    elif key == 'alternate':
+        ok = isinstance( v, list ) and all( isinstance( id, str ) for id in v )
+    else:
+        ok = isinstance( v, list )        # route steps are checked by Plan.read_route()
+    if not ok: raise PlanError( f'bad value for {key}: {v!r}' )
+
+#--------------------------------------------------------------
+# Results
+#--------------------------------------------------------------
+@dataclass
+class Check:
+    name:       str             # what was checked, e.g., 'takeoff_weight'
+    ok:         bool
+    message:    str
+
+@dataclass
+class WeightItem:
+    weight:     float
+    arm:        float
+    moment:     float
+
+@dataclass
+class WeightBalance:
+    weight_for: str             # tail number, or type if no tail
+    fuel_gal:   float
+    empty:      WeightItem
+    fuel:       WeightItem
+    row1:       WeightItem
+    row2:       WeightItem
+    baggage1:   WeightItem
+    baggage2:   WeightItem
+    total:      WeightItem
+    no_fuel:    WeightItem
+    checks:     list
+
+@dataclass
+class Leg:
+    name:       str
+    lat:        float
+    lon:        float
+    TC:         float
+    IA:         float
+    ALT:        float
+    WD:         float
+    WS:         float
+    OAT:        float
+    IAS:        float
+    CAS:        float
+    TAS:        float
+    WCA:        float
+    TH:         float
+    MV:         float
+    MH:         float
+    DEV:        float
+    CH:         float
+    D:          float
+    DTOT:       float
+    GS:         float
+    ETE:        float
+    ETA:        float
+    GPH:        float
+    GAL:        float
+    REM:        float
+
+@dataclass
+class Navlog:
+    kind:       str             # 'outbound' or 'return'
+    runway:     int             # takeoff runway heading
+    legs:       list
+    fuel_time_left_hr:      float
+    fuel_time_left_min_hr:  float
+    check:      Check
+
+@dataclass
+class ShortField:
+    kind:       str             # 'TAKEOFF' or 'LANDING'
+    id:         str
+    weight:     float
+    PA:         float           # pressure altitude
+    elevation:  float
+    altimeter:  float
+    oat:        float
+    roll:       float           # ground roll
+    clear50:    float           # length to clear 50 ft obstacle
+    runway:     str             # runway end, '' if no runway has a heading
+    length:     float           # its runway's length
+    headwind:   float           # wind components for it (negative = tailwind)
+    crosswind:  float           # (positive = from the right)
+
+@dataclass
+class Runway:
+    id:         str
+    length:     float
+    width:      float
+    pattern:    str             # traffic pattern direction for each end, e.g., 'L/R'
+    condition:  str
+
+@dataclass
+class Diversion:
+    checkpoint: str             # checkpoint name
+    along:      float           # nm along the route to the checkpoint
+    rank:       int             # 1 = best ETE from the checkpoint
+    id:         str
+    name:       str
+    from_city:  str
+    lat:        float
+    lon:        float
+    elevation:  float
+    public:     bool
+    towered:    bool
+    ctaf_freq:  str
+    unicom_freq: str
+    runway:     Runway          # longest runway that passes the diversion filters
+    CH:         float
+    D:          float
+    ETE:        float
+    segment:    dict            # everything from calc_segment()
+
+@dataclass
+class CorridorAirport:
+    leg:        int             # route index of the checkpoint at the end of the leg
+    leg_from:   str             # checkpoint names
+    leg_to:     str
+    id:         str
+    name:       str
+    along:      float           # nm from the start of the leg (negative = before it)
+    abeam:      float           # cross-track nm (positive = right of track)
+    distance:   float           # nm to the nearest point of the leg
+    length:     float           # longest runway
+
+@dataclass
+class GlideSegment:
+    leg:        int             # route index of the checkpoint at the end of the leg
+    leg_from:   str             # checkpoint names
+    leg_to:     str
+    start:      float           # nm along the route
+    end:        float
+    covered:    bool            # whether an airport is in gliding range all along it
+    airports:   str             # ids of the airports in range somewhere along it, as they come into range
+
+@dataclass
+class Glide:
+    Vg:         float           # best glide speed (KIAS)
+    ratio:      float           # nm per 1000 ft above the field
+    margin_ft:  float           # height above the field to arrive with
+    step_nm:    float           # how often it was checked
+    covered_nm: float
+    total_nm:   float
+    segments:   list            # GlideSegments in route order
+
+@dataclass
+class Frequency:
+    kind:       str
+    freq:       str
+    remarks:    str
+    telephone:  str             # None if there is none
+
+@dataclass
+class Navaid:
+    kind:       str
+    id:         str
+    name:       str
+    freq:       str
+    distance:   str
+    bearing:    str
+    remarks:    str
+    morse:      str
+
+@dataclass
+class AirportInfo:
+    id:         str
+    name:       str
+    from_city:  str
+    elevation:  float
+    runways:    list
+    freqs:      list
+    navaids:    list
+
+@dataclass
+class PlanResult:
+    # sections that weren't asked for are None
+    route:              list    # checkpoint dicts
+    runway_length_min:  int     # for diversions
+    weight_balance:     WeightBalance = None
+    navlogs:            list = None         # outbound, then return if show_return
+    takeoff:            ShortField = None
+    landing:            ShortField = None
+    diversions:         list = None
+    diversion_filter:   str = None          # e.g., 'ASPH/CONC, public use' ('' = none beyond runway_length_min)
+    corridor_nm:        float = None
+    corridor:           list = None
+    glide:              Glide = None
+    airports:           list = None
+
+# sections of a plan, in output order, and the ones planned unless others are asked for
+#
+DIVERSION_SWEEP_NM = 25.0      # how far off the leg a diversion profile's sweep looks (AirportIndex.sweep)
+
+SECTIONS         = [ 'weight_balance', 'navlog', 'short_field', 'diversions', 'corridor', 'glide', 'airports' ]
+DEFAULT_SECTIONS = [ 'weight_balance', 'navlog', 'short_field', 'diversions', 'airports' ]
+
+#--------------------------------------------------------------
+# Planner
+#--------------------------------------------------------------
+class Planner:
+
+    def __init__( self, rawdata, magvar_cof='', magvar_cache='' ):
+        # magvar_cof   - WMM coefficient file to use instead of the built-in WMM2020 ('' = built-in)
+        # magvar_cache - directory for saving/reusing the magnetic variation grid ('' = don't)
+        self.rawdata       = rawdata
+        self.magvar_cof    = magvar_cof
+        self.magvar_cache  = magvar_cache
+        self.types         = {}             # compiled aircraft by name
+        self.tails         = {}
+        self.airport_index = None           # built on first use
+        self.diversion_summaries = {}       # by airport id, see diversion_summary()
+        # the model is registered by name rather than made current, so planners with different models can coexist
+        self.magvar_model  = MagVar.load_cof( magvar_cof ).name if magvar_cof != '' else MagVar.model_name
+        self.magvar_date   = date.today()
+        self.magvar_grid   = MagVar.today_grid( magvar_cache, name=self.magvar_model )
+
+    def grid( self ):
+        # today's grid, also after midnight in a long-running process
+        if date.today() != self.magvar_date:
+            self.save_magvar_grid()
+            self.magvar_date = date.today()
+            self.magvar_grid = MagVar.today_grid( self.magvar_cache, name=self.magvar_model )
+        return self.magvar_grid
+
+    def save_magvar_grid( self ):
+        if self.magvar_cache == '' or not self.magvar_grid['dirty']: return
+        os.makedirs( self.magvar_cache, exist_ok=True )
+        d = self.magvar_date
+        MagVar.save_grid( self.magvar_grid, MagVar.grid_path( self.magvar_cache, d.year, d.month, d.day, self.magvar_model ) )
+
+    def index( self ):
+        if self.airport_index is None: self.airport_index = AirportIndex.build( self.rawdata )
+        return self.airport_index
+
+    def diversion_summary( self, id ):
+        if id not in self.diversion_summaries: self.diversion_summaries[id] = diversion_summary( self.rawdata[id] )
+        return self.diversion_summaries[id]
+
+    def load_aircraft( self, type, tail ):
+        # unknown names aren't remembered, so a service can't be made to fill memory with them
+        try:
+            if type not in self.types:
+                type_info = Aircraft.load_type( type )
+                if type_info is not None: self.types[type] = type_info
+            if tail != '' and tail not in self.tails:
+                tail_info = Aircraft.load_tail( tail )
+                if tail_info is not None: self.tails[tail] = tail_info
+        except ValueError as e:
+            raise PlanError( str( e ) )
+        type_info = self.types.get( type )
+        tail_info = self.tails.get( tail )
+        if type_info is None: raise PlanError( f'unknown aircraft type: {type} (known types: {" ".join( Aircraft.type_names() )})' )
+        if tail != '' and tail_info is None: raise PlanError( f'unknown aircraft tail number: {tail} (known tails: {" ".join( Aircraft.tail_names() )})' )
+        return (type_info, tail_info)
+
+    def warm( self ):
+        # gets everything a plan might need ready up front, e.g., before forking workers
+        self.index()
+        MagVar.fill_grid( self.grid() )
+        for type in Aircraft.type_names():
+            try:
+                self.load_aircraft( type, '' )
+            except PlanError:
+                pass                    # reported to the plans that use it
+        for tail in Aircraft.tail_names():
+            try:
+                self.load_aircraft( OPTIONS['t'], tail )
+            except PlanError:
+                pass
+
+    def plan( self, spec, sections=DEFAULT_SECTIONS ):
+        #--------------------------------------------------------------
+        # Only the sections asked for are computed, along with what they
+        # need from other sections (e.g., short_field needs the W&B total
+        # weight, but not the W&B checks).  A navlog-only fuel check never
+        # looks at the airports around the route.
+        #--------------------------------------------------------------
+        for section in sections:
+            if section not in SECTIONS: raise PlanError( f'unknown section: {section} (known sections: {" ".join( SECTIONS )})' )
+        p = Plan( self, spec )
+        result = PlanResult( p.route, p.opts['runway_length_min'] )
+        if 'weight_balance' in sections:
+            result.weight_balance = p.weight_balance()
+        if 'navlog' in sections:
+            result.navlogs = [ p.navlog( 'outbound' ) ]
+            if p.opts['show_return']: result.navlogs.append( p.navlog( 'return' ) )
+        if 'short_field' in sections:
+            result.takeoff = p.short_field( 'TAKEOFF' )
+            result.landing = p.short_field( 'LANDING' )
+        if 'diversions' in sections:
+            result.diversions = p.diversions()
+            result.diversion_filter = p.diversion_filters()[2]
+        if 'corridor' in sections:
+            result.corridor_nm = p.opts['corridor_nm']
+            result.corridor = p.corridor()
+        if 'glide' in sections:
+            result.glide = p.glide()
+        if 'airports' in sections:
+            result.airports = p.airports()
+        return result
+
+#--------------------------------------------------------------
+# next 3 functions were transcribed from http://indoavis.co.id/main/tas.html Javascript code
+# (they produce answers that are pretty close to my E6B app):
+#--------------------------------------------------------------
+lapserate = 0.0019812		        # degrees / foot std. lapse rate C° in to K° result
+tempcorr = 273.15			# Kelvin
+stdtemp0 = 288.15			# Kelvin
+
+def calc_PA( IA, ALT ):
+    #std_ALT = 29.92
+    #xx = std_ALT / 29.92126
+    #PA = IA + 145442.2*(1 - pow(xx, 0.190261))
+    PA = IA + 1000*(29.92 - ALT)
+    return PA
+
+def calc_DA( PA, OAT ):
+    stdtemp = stdtemp0 - PA*lapserate
+    Tratio = stdtemp / lapserate
+    xx = stdtemp / (OAT + tempcorr)
+    DA = PA + Tratio*(1 - pow(xx, 0.234969))
+    return DA
+
+def calc_TAS( CAS, DA ):
+    aa = DA * lapserate                 # Calculate DA temperature
+    bb = stdtemp0 - aa			# Correct DA temp to Kelvin
+    cc = bb / stdtemp0			# Temperature ratio
+    cc1 = 1 / 0.234969			# Used to find .235 root next
+    dd = pow(cc, cc1)			# Establishes Density Ratio
+    dd = pow(dd, .5)			# For TAS, square root of DR
+    ee = 1 / dd				# For TAS; 1 divided by above
+    TAS = ee * CAS
+    return TAS
+
+def lerp( f, v0, v1 ):
+    return (1-f)*v0 + f*v1
+
+def normalize_heading( hdg ):
+    if hdg < 0:   hdg += 360
+    if hdg > 360: hdg -= 360
+    return hdg
+
+def runway_info( r ):
+    # {'site': '16756.3*A', 'id': '09/27', 'length': 2400, 'width': 30, 'condition': 'ASPH-F', 'pattern': '', 'pattern_rcp': 'N'}
+    pattern     = 'R' if r['pattern'] == 'Y' else 'L'
+    pattern_rcp = 'R' if r['pattern_rcp'] == 'Y' else 'L'
+    return Runway( r['id'], r['length'], r['width'], f'{pattern}/{pattern_rcp}', r['condition'] )
+
+morse_code_chars = { 'A':'.-', 'B':'-...',
+                     'C':'-.-.', 'D':'-..', 'E':'.',
+                     'F':'..-.', 'G':'--.', 'H':'....',
+                     'I':'..', 'J':'.---', 'K':'-.-',
+                     'L':'.-..', 'M':'--', 'N':'-.',
+                     'O':'---', 'P':'.--.', 'Q':'--.-',
+                     'R':'.-.', 'S':'...', 'T':'-',
+                     'U':'..-', 'V':'...-', 'W':'.--',
+                     'X':'-..-', 'Y':'-.--', 'Z':'--..',
+                     '1':'.----', '2':'..---', '3':'...--',
+                     '4':'....-', '5':'.....', '6':'-....',
+                     '7':'--...', '8':'---..', '9':'----.',
+                     '0':'-----', ', ':'--..--', '.':'.-.-.-',
+                     '?':'..--..', '/':'-..-.', '-':'-....-',
+                     '(':'-.--.', ')':'-.--.-'}
+
+#--------------------------------------------------------------
+# Diversion filters
+#--------------------------------------------------------------
+def best_D( best ):
+    # how far the farthest of the best diversions so far is; anything twice as far can't beat them
+    return max( b[1]['D'] for b in best )
+
+def diversion_summary( info ):
+    # what the diversion filters look at, longest runway first (see AirportStore.runway_summary())
+    summary = AirportStore.runway_summary( info )
+    runways = info['runways']
+    order = sorted( range(len(runways)), key=lambda i: -runways[i]['length'] )
+    return { 'runways': [ { 'length': runways[i]['length'], 'width': runways[i]['width'], 'surface': summary['surfaces'][i], 'runway': runways[i] }
+                          for i in order ],
+             'public':  summary['public'],
+             'towered': summary['towered'] }
+
+def diversion_filters( opts ):
+    #--------------------------------------------------------------
+    # Returns (runway filters, airport filters, description) for the diversion
+    # options.  An airport qualifies if it passes every airport filter and one
+    # of its runways passes every runway filter.  Runway filters take one of
+    # the runways in a diversion_summary(), airport filters the summary itself.
+    #--------------------------------------------------------------
+    runway_filters  = []
+    airport_filters = []
+    what = []
+    length = opts['runway_length_min']
+    runway_filters.append( lambda r: r['length'] >= length )
+    surfaces = [ s.strip().upper() for s in opts['diversion_surface'].split( ',' ) if s.strip() != '' ]
+    if len( surfaces ) > 0:
+        codes = ''
+        for s in surfaces:
+            if s == 'HARD':
+                codes += AirportStore.HARD_SURFACES
+            elif s in AirportStore.SURFACE_CODES:
+                codes += AirportStore.SURFACE_CODES[s]
+            else:
+                raise PlanError( f'unknown diversion_surface: {s} (known surfaces: HARD {" ".join( AirportStore.SURFACE_CODES )})' )
+        runway_filters.append( lambda r: any( c in codes for c in r['surface'] ) )
+        what.append( '/'.join( surfaces ) )
+    width = opts['diversion_width_min']
+    if width > 0:
+        runway_filters.append( lambda r: r['width'] >= width )
+        what.append( f'width >= {width} ft' )
+    if opts['diversion_public']:
+        airport_filters.append( lambda a: a['public'] )
+        what.append( 'public use' )
+    if opts['diversion_tower'] == 'towered':
+        airport_filters.append( lambda a: a['towered'] )
+        what.append( 'towered' )
+    elif opts['diversion_tower'] == 'ctaf':
+        airport_filters.append( lambda a: not a['towered'] )
+        what.append( 'CTAF' )
+    return (runway_filters, airport_filters, ', '.join( what ))
+
+def get_morse_code( s ):
+    su = s.upper()
+    mc = ''
+    for i in range(len(su)):
+        if mc != '': mc += ' '
+        c = su[i]
+        mc += morse_code_chars[c] if c in morse_code_chars else f'[{c}]'
+    return mc
+
+#--------------------------------------------------------------
+# One plan
+#--------------------------------------------------------------
+class Plan:
+
+    def __init__( self, planner, spec ):
+        self.planner = planner
+        self.rawdata = planner.rawdata
+        if not isinstance( spec, dict ): raise PlanError( 'plan spec must be an object' )
+        opts = dict( OPTIONS )
+        for key in spec:
+            if key not in OPTIONS: raise PlanError( f'unknown option: {key}' )
+            check_option( key, spec[key] )
+            opts[key] = spec[key]
+        opts['t']    = opts['t'].upper()
+        opts['tail'] = opts['tail'].upper()
+        opts['alternate'] = [ id.upper() for id in opts['alternate'] ]
+        for id in opts['alternate']:
+            if id not in self.rawdata: raise PlanError( f'unknown alternate airport: {id}' )
+        if opts['diversion_tower'] not in [ '', 'towered', 'ctaf' ]: raise PlanError( f'diversion_tower must be towered or ctaf, not {opts["diversion_tower"]!r}' )
+        if opts['diversion_k'] < 1: raise PlanError( f'diversion_k must be at least 1, not {opts["diversion_k"]}' )
+        self.opts = opts
+        self.route = self.read_route( opts['route'] )
+        if len( self.route ) == 0: raise PlanError( 'no route: give at least one checkpoint' )
+
+        self.type_info, self.tail_info = planner.load_aircraft( opts['t'], opts['tail'] )
+        type_info = self.type_info
+        self.fuel_gal      = opts['fuel_gal']      if opts['fuel_gal'] > 0      else type_info['fuel_gal_max']
+        self.fuel_gal_taxi = opts['fuel_gal_taxi'] if opts['fuel_gal_taxi'] > 0 else type_info['fuel_gal_taxi']
+        if self.fuel_gph <= 0: self.fuel_gph = type_info['fuel_gph']        # TODO: need to look at tables for this
+
+        # tables compiled by Aircraft.py (see Table.py); CAS and deviation are looked up for every
+        # segment and diversion candidate, so those also come as per-knot/per-degree cards
+        #
+        self.cas_flaps       = type_info['compiled']['cas_flaps']
+        self.cas_cards       = type_info['compiled']['cas_cards']
+        self.normal_cg_table = type_info['compiled']['normal_cg']
+        self.takeoff_table   = type_info['compiled']['short_field_takeoff']
+        self.landing_table   = type_info['compiled']['short_field_landing']
+        self.deviation_card  = self.tail_info['compiled']['deviation_card'] if self.tail_info else None
+        self.magvar_grid     = planner.grid()
+        self.memos           = {}                           # results shared between sections
+
+    def read_route( self, steps ):
+        rawdata = self.rawdata
+        state = { key: self.opts[key] for key in CHECKPOINT_OPTIONS }
+        route = []
+        for step in steps:
+            if not isinstance( step, dict ): raise PlanError( f'route step must be an object: {step!r}' )
+            for key in step:
+                if key == 'p':
+                    if not isinstance( step[key], str ): raise PlanError( f'bad value for p: {step[key]!r}' )
+                    continue
+                if key not in CHECKPOINT_OPTIONS: raise PlanError( f'not a checkpoint option: {key}' )
+                check_option( key, step[key] )
+                state[key] = step[key]
+            if 'p' not in step: continue
+            id = step['p'].upper()
+            if id in rawdata:
+                lat = rawdata[id]['lat']
+                lon = rawdata[id]['lon']
+                if state['ia'] == 0: state['ia'] = rawdata[id]['elevation']
+                state['name'] = id
+            else:
+                # might be lat,lon
+                matches = re.match( r'^(-?\d+\.\d+)[,\/](-?\d+\.\d+)$', id );
+                if matches:
+                    lat = float(matches.group(1))
+                    lon = float(matches.group(2))
+                else:
+                    matches = re.match( r'^(\d\d)(\d\d)(N|S)(\d\d\d)(\d\d)(E|W)$', id );
+                    if not matches: raise PlanError( f'unknown airport/waypoint and not a proper lat/lon: {id}' )
+                    lat = float(matches.group(1)) + float(matches.group(2))/60.0
+                    NS  = matches.group(3)
+                    if NS == 'S': lat = -lat
+                    lon = float(matches.group(4)) + float(matches.group(5))/60.0
+                    EW = matches.group(6)
+                    if EW == 'W': lon = -lon
+                id = ''
+            route.append( { 'id': id, 'name': state['name'], 'lat': lat, 'lon': lon, 'ias': state['ias'], 'ia': state['ia'],
+                            'alt': state['alt'], 'flaps': state['flaps'], 'wind_dir': state['wd'], 'wind_speed': state['ws'],
+                            'oat': state['oat'], 'fuel_gph': state['fuel_gph'] } )
+        self.fuel_gph = state['fuel_gph']       # the last one given is the default
+        return route
+
+    #--------------------------------------------------------------
+    # Weight and Balance
+    #--------------------------------------------------------------
+    def memo( self, key, compute, *args ):
+        if key not in self.memos: self.memos[key] = compute( *args )
+        return self.memos[key]
+
+    def weight_balance( self ):
+        return self.memo( 'weight_balance', self.calc_weight_balance )
+
+    def calc_weight_balance( self ):
+        opts      = self.opts
+        type_info = self.type_info
+        tail_info = self.tail_info
+        def item( weight, arm ):
+            return WeightItem( weight, arm, weight * arm )
+        empty    = item( tail_info['empty_weight'] if tail_info else type_info['empty_weight'],
+                         tail_info['empty_arm']    if tail_info else type_info['empty_arm'] )
+        fuel     = item( self.fuel_gal * type_info['fuel_gal_weight'], type_info['fuel_arm'] )
+        row1     = item( opts['row1_weight'],     type_info['row1_arm'] )
+        row2     = item( opts['row2_weight'],     type_info['row2_arm'] )
+        baggage1 = item( opts['baggage1_weight'], type_info['baggage1_arm'] )
+        baggage2 = item( opts['baggage2_weight'], type_info['baggage2_arm'] )
+        total_weight = 0
+        total_moment = 0
+        for it in [empty, fuel, row1, row2, baggage1, baggage2]:
+            total_weight += it.weight
+            total_moment += it.moment
+        total = WeightItem( total_weight, total_moment / total_weight, total_moment )
+
+        checks = []
+        baggage1_weight     = baggage1.weight
+        baggage1_weight_max = type_info['baggage1_weight_max']
+        baggage2_weight     = baggage2.weight
+        baggage2_weight_max = type_info['baggage2_weight_max']
+        baggage_weight      = baggage1_weight + baggage2_weight
+        baggage_weight_max  = type_info['baggage_weight_max']
+        takeoff_weight_max  = type_info['takeoff_weight_max']
+        if baggage1_weight > baggage1_weight_max:
+            checks.append( Check( 'baggage1_weight', False, f'PROBLEM: area 1 baggage weight ({baggage1_weight}) > max allowed ({baggage1_weight_max})' ) )
+        if baggage2_weight > baggage2_weight_max:
+            checks.append( Check( 'baggage2_weight', False, f'PROBLEM: area 2 baggage weight ({baggage2_weight}) > max allowed ({baggage2_weight_max})' ) )
+        if baggage_weight  > baggage_weight_max:
+            checks.append( Check( 'baggage_weight', False, f'PROBLEM: area 1+2 baggage weight ({baggage_weight}) > max allowed ({baggage_weight_max})' ) )
+        if total_weight <= takeoff_weight_max:
+            checks.append( Check( 'takeoff_weight', True, f'VERIFIED: takeoff weight ({total_weight}) <= max allowed ({takeoff_weight_max})' ) )
+        else:
+            checks.append( Check( 'takeoff_weight', False, f'!!! PROBLEM: takeoff weight ({total_weight}) > max allowed ({takeoff_weight_max})' ) )
+        checks.append( self.cg_check( 'takeoff_cg', 'takeoff', total ) )
+        no_fuel_weight = total.weight - fuel.weight
+        no_fuel_moment = total.moment - fuel.moment
+        no_fuel = WeightItem( no_fuel_weight, no_fuel_moment / no_fuel_weight, no_fuel_moment )
+        checks.append( self.cg_check( 'no_fuel_cg', 'empty-fuel', no_fuel ) )
+        return WeightBalance( opts['tail'] if tail_info else opts['t'], self.fuel_gal,
+                              empty, fuel, row1, row2, baggage1, baggage2, total, no_fuel, checks )
+
+    def cg_check( self, check_name, what, it ):
+        cg_min, cg_max = Table.lookup( self.normal_cg_table, it.weight )
+        if it.arm >= cg_min and it.arm <= cg_max:
+            pct = (it.arm-cg_min) * 100.0 / (cg_max - cg_min)
+            return Check( check_name, True, f'VERIFIED: {what} CG ({it.arm:0.2f}) is {pct:.1f}% of normal range ({cg_min:.2f} .. {cg_max:.2f})' )
+        else:
+            return Check( check_name, False, f'!!! PROBLEM: {what} CG ({it.arm:0.2f}) is OUTSIDE normal range ({cg_min:.2f} .. {cg_max:.2f})' )
+
+    #--------------------------------------------------------------
+    # NavLog
+    #--------------------------------------------------------------
+    def calc_CAS( self, IAS, FLAPS ):
+        # first table with flaps >= FLAPS
+        i = bisect_left( self.cas_flaps, FLAPS )
+        if i == len( self.cas_flaps ): raise PlanError( f'flaps={FLAPS} has no relevant entry in the CAS table' )
+        return Table.card_lookup( self.cas_cards[i], IAS )
+
+    def calc_DEV( self, MH ):
+        return Table.card_lookup( self.deviation_card, MH ) - MH
+
+    def reverse_route( self, rt ):
+        rev = []
+        for i in range(len(rt)):
+            j = len(rt)-1-i
+            rev.append( rt[j].copy() )
+            rev[i]['ias'] = rt[i]['ias']                            # hack
+            rev[i]['ia'] = rt[i]['ia']                              # hack
+            rev[i]['wind_dir'] = rt[i]['wind_dir']                  # hack
+            rev[i]['wind_speed'] = rt[i]['wind_speed']              # hack
+            rev[i]['oat'] = rt[i]['oat']                            # hack
+            rev[i]['fuel_gph'] = rt[i]['fuel_gph']                  # hack
+        id = rev[0]['id']
+        if id in self.rawdata: rev[0]['ia'] = self.rawdata[id]['elevation']   # hack, but usually correct
+        return rev
+
+    def checkpoint_magvar( self, cp ):
+        # make_rawdata.py stores each facility's variation for the data cycle, so only raw
+        # lat/lon checkpoints need a live value (also when using a different model than the build)
+        id = cp['id']
+        if id != '' and self.planner.magvar_cof == '':
+            info = self.rawdata.get( id )
+            if info is not None and 'magvar' in info: return info['magvar']
+        return MagVar.grid_magvar( self.magvar_grid, cp['lat'], cp['lon'] )
+
+    def calc_segment( self, fm, to, i, runway ):
+        FM_LAT = fm['lat']
+        FM_LON = fm['lon']
+        TO_LAT = to['lat']
+        TO_LON = to['lon']
+        FM_IAS = fm['ias']
+        TO_IAS = to['ias']
+        FM_WS  = fm['wind_speed']
+        TO_WS  = to['wind_speed']
+        FM_WD  = fm['wind_dir']
+        TO_WD  = to['wind_dir']
+        FM_IA  = fm['ia']
+        TO_IA  = to['ia']
+        FM_ALT = fm['alt']
+        TO_ALT = to['alt']
+        FM_FLAPS = fm['flaps']
+        TO_FLAPS = to['flaps']
+        FM_OAT = fm['oat']
+        TO_OAT = to['oat']
+        FM_GPH = fm['fuel_gph'] if fm['fuel_gph'] > 0 else self.fuel_gph
+        TO_GPH = to['fuel_gph'] if to['fuel_gph'] > 0 else self.fuel_gph
+
+        D    = Geodesic.distance( FM_LAT, FM_LON, TO_LAT, TO_LON )
+        TC   = (runway * 10) if i == 0 else Geodesic.initial_bearing( FM_LAT, FM_LON, TO_LAT, TO_LON )
+        CAS  = self.calc_CAS( TO_IAS, TO_FLAPS )
+        WA   = TO_WD + 180
+        while WA > 360: WA -= 360
+        WTA  = TC - WA
+        DIA  = TO_IA
+        PA   = calc_PA( TO_IA, TO_ALT )
+        DA   = calc_DA( PA, TO_OAT )
+        TAS  = calc_TAS( CAS, DA )
+        WCA  = RAD_TO_DEG*asin( TO_WS * sin( DEG_TO_RAD*WTA ) / TAS )
+        TH   = TC + WCA
+        MV   = (-self.checkpoint_magvar( fm ) + -self.checkpoint_magvar( to )) / 2.0
+        if i == 0:
+            TC -= MV
+            TH  = TC
+        MH   = TH + MV
+        DEV  = self.calc_DEV( MH ) if self.deviation_card else 0
+        CH   = MH + DEV
+        GS   = TAS*cos( DEG_TO_RAD*WCA ) + TO_WS*cos( DEG_TO_RAD*WTA )
+        ETE  = D/GS * 60.0
+        GPH  = TO_GPH
+        GAL  = (ETE / 60.0 * GPH) if i != 0 else self.fuel_gal_taxi
+
+        return { 'TC': TC, 'CAS': CAS, 'TAS': TAS, 'WCA': WCA, 'TH': TH, 'MV': MV, 'MH': MH, 'DEV': DEV, 'CH': CH, 'D': D, 'GS': GS, 'ETE': ETE, 'GPH': GPH, 'GAL': GAL }
+
+    def navlog( self, kind ):
+        return self.memo( ('navlog', kind), self.calc_navlog, kind )
+
+    def calc_navlog( self, kind ):
+        # the return flight starts with what is left after the outbound one unless refilled
+        opts = self.opts
+        if kind == 'outbound':
+            rt      = self.route
+            runway  = opts['runway']
+            gal_rem = self.fuel_gal
+        else:
+            rt      = self.reverse_route( self.route )
+            runway  = opts['runway_return']
+            gal_rem = self.fuel_gal if opts['fuel_refill'] else self.navlog( 'outbound' ).legs[-1].REM
+        legs = []
+        DTOT = 0
+        ETA = 0
+        for i in range(len(rt)):
+            fm = rt[0] if i == 0 else rt[i-1]
+            to = rt[i]
+            c = self.calc_segment( fm, to, i, runway )
+            DTOT += c['D']
+            ETA += c['ETE']
+            gal_rem -= c['GAL']
+            legs.append( Leg( name=to['name'], lat=to['lat'], lon=to['lon'], TC=normalize_heading( c['TC'] ),
+                              IA=to['ia'], ALT=to['alt'], WD=to['wind_dir'], WS=to['wind_speed'], OAT=to['oat'],
+                              IAS=to['ias'], CAS=c['CAS'], TAS=c['TAS'], WCA=c['WCA'], TH=normalize_heading( c['TH'] ),
+                              MV=c['MV'], MH=normalize_heading( c['MH'] ), DEV=c['DEV'], CH=normalize_heading( c['CH'] ),
+                              D=c['D'], DTOT=DTOT, GS=c['GS'], ETE=c['ETE'], ETA=ETA, GPH=c['GPH'], GAL=c['GAL'], REM=gal_rem ) )
+
+        fuel_time_left_hr = gal_rem / self.fuel_gph
+        fuel_time_left_min_hr = opts['fuel_time_left_min'] / 60.0
+        if fuel_time_left_hr >= fuel_time_left_min_hr:
+            check = Check( 'fuel_time_left', True, f'VERIFIED: fuel time left ({fuel_time_left_hr:0.2f} hr) >= minimum allowed ({fuel_time_left_min_hr:0.2f} hr)' )
+        else:
+            check = Check( 'fuel_time_left', False, f'!!! PROBLEM: fuel time_left ({fuel_time_left_hr:0.2f} hr) < minimum allowed ({fuel_time_left_min_hr:0.2f} hr)' )
+        return Navlog( kind, runway, legs, fuel_time_left_hr, fuel_time_left_min_hr, check )
+
+    #--------------------------------------------------------------
+    # Short-Field Takeoff and Landing Distances
+    #--------------------------------------------------------------
+    def short_field( self, kind ):
+        cp = self.route[0] if kind == 'TAKEOFF' else self.route[-1]
+        if cp['id'] == '': raise PlanError( f'short-field {kind.lower()} distances need an airport, not {cp["lat"]:.4f},{cp["lon"]:.4f}' )
+        weight = self.weight_balance().total.weight
+        ELE  = self.rawdata[cp['id']]['elevation']
+        PA   = calc_PA( ELE, cp['alt'] )
+        table = self.takeoff_table if kind == 'TAKEOFF' else self.landing_table
+        ROLL, CLEAR50 = Table.lookup( table, weight, cp['oat'], PA )
+        end, length, headwind, crosswind = self.runway_end( cp, self.opts['runway']*10 if kind == 'TAKEOFF' else None )
+        return ShortField( kind, cp['id'], weight, PA, ELE, cp['alt'], cp['oat'], ROLL, CLEAR50, end, length, headwind, crosswind )
+
+    def runway_end( self, cp, heading ):
+        #--------------------------------------------------------------
+        # Returns (end, length, headwind, crosswind) for the runway end at cp's airport
+        # within 30 degrees of heading (magnetic), or with heading None or no end that
+        # close, the one most into cp's wind.  The runway headings come from the
+        # store's runway summary.
+        #--------------------------------------------------------------
+        info = self.rawdata[cp['id']]
+        headings = AirportStore.runway_summary( info )['headings']
+        ends = []
+        for r, hs in zip( info['runways'], headings ):
+            names = r['id'].split( '/' )
+            for j in range(2):
+                if hs[j] is not None: ends.append( (names[j] if j < len( names ) else r['id'], hs[j], r['length']) )
+        if len( ends ) == 0: return ('', 0, 0.0, 0.0)
+        MV = self.checkpoint_magvar( cp )
+        def wind( h ):
+            # runway headings are magnetic, the wind is true
+            a = DEG_TO_RAD*(cp['wind_dir'] - (h + MV))
+            return (cp['wind_speed']*cos( a ), cp['wind_speed']*sin( a ))
+        close = [ e for e in ends if heading is not None and abs( (e[1] - heading + 180) % 360 - 180 ) <= 30 ]
+        if len( close ) > 0:
+            end = max( close, key=lambda e: e[2] )
+        else:
+            end = max( ends, key=lambda e: (wind( e[1] )[0], e[2]) )
+        headwind, crosswind = wind( end[1] )
+        return (end[0], end[2], headwind, crosswind)
+
+    #--------------------------------------------------------------
+    # Closest Diversions
+    #--------------------------------------------------------------
+    def checkpoints( self ):
+        return self.memo( 'checkpoints', self.calc_checkpoints )
+
+    def calc_checkpoints( self ):
+        # route checkpoints plus 25%, 50% and 75% points between them, or with diversion_step_nm
+        # or diversion_step_min, points that far apart along the leg (a diversion profile);
+        # each one also gets its 'along' (nm along the route) and 'leg'
+        route = self.route
+        step_nm  = self.opts['diversion_step_nm']
+        step_min = self.opts['diversion_step_min']
+        checkpoints = []
+        j = len(route) - 1
+        along = 0.0
+        for i in range(len(route)):
+            cp = route[i].copy()
+            cp['along'] = along
+            cp['leg']   = i
+            checkpoints.append( cp )
+            if i == j: break
+            D = Geodesic.distance( route[i]['lat'], route[i]['lon'], route[i+1]['lat'], route[i+1]['lon'] )
+            if step_nm <= 0 and step_min <= 0:
+                for pct in [25, 50, 75]:
+                    f = pct/100.0
+                    cp = route[i].copy()
+                    cp['id']  = ''
+                    cp['name'] = f'  {pct}%'
+                    cp['lat'] = lerp( f, route[i]['lat'], route[i+1]['lat'] )
+                    cp['lon'] = lerp( f, route[i]['lon'], route[i+1]['lon'] )
+                    cp['along'] = along + f*D
+                    cp['leg']   = i
+                    checkpoints.append( cp )
+            else:
+                # on the great circle, so AirportIndex.sweep() can find their airports
+                if step_nm > 0:
+                    step = step_nm
+                else:
+                    step = self.navlog( 'outbound' ).legs[i+1].GS * step_min / 60.0
+                n = int( D / step )
+                if n * step >= D - 1e-6: n -= 1
+                ds = [ k*step for k in range(1, n+1) ]
+                a = Geodesic.initial_bearing( route[i]['lat'], route[i]['lon'], route[i+1]['lat'], route[i+1]['lon'] ) * DEG_TO_RAD
+                lats, lons = Geodesic.destination_many( route[i]['lat'], route[i]['lon'], a, ds, True )
+                for k in range(n):
+                    cp = route[i].copy()
+                    cp['id']  = ''
+                    cp['name'] = f'  +{ds[k]:.0f} nm' if step_nm > 0 else f'  +{(k+1)*step_min:g} min'
+                    cp['lat'] = lats[k]
+                    cp['lon'] = lons[k]
+                    cp['along'] = along + ds[k]
+                    cp['leg']   = i
+                    checkpoints.append( cp )
+            along += D
+        return checkpoints
+
+    def diversions( self ):
+        return self.memo( 'diversions', self.calc_diversions )
+
+    def calc_diversions( self ):
+        # the index hands back airports closest first, so we can stop once
+        # they are too far away to beat the best ETE found so far
+        #
+        # A diversion profile has many points per leg, and neighboring points mostly see the
+        # same airports, so each leg's airports are looked up once and swept along it
+        # (AirportIndex.sweep).  A point whose best diversion could be farther than the sweep
+        # reaches falls back to its own nearest() search.
+        #
+        rawdata = self.rawdata
+        checkpoints = self.checkpoints()
+        airport_index = self.planner.index()
+        runway_length_min = self.opts['runway_length_min']
+        near = {}
+        if self.opts['diversion_step_nm'] > 0 or self.opts['diversion_step_min'] > 0:
+            route = self.route
+            for leg in range(len(route)-1):
+                ks = [ k for k in range(len(checkpoints)) if checkpoints[k]['leg'] == leg ]
+                base = checkpoints[ks[0]]['along']
+                sweep = AirportIndex.sweep( airport_index, route[leg]['lat'], route[leg]['lon'], route[leg+1]['lat'], route[leg+1]['lon'],
+                                            [ checkpoints[k]['along'] - base for k in ks ],
+                                            [ checkpoints[k]['lat'] for k in ks ],
+                                            [ checkpoints[k]['lon'] for k in ks ], DIVERSION_SWEEP_NM, runway_length_min )
+                for k, found in zip( ks, sweep ): near[k] = found
+        k = int( self.opts['diversion_k'] )
+        diversions = []
+        for i in range(len(checkpoints)):
+            done = False
+            if i in near:
+                best, done = self.closest_diversions( checkpoints, i, near[i], k )
+                if not done and len( best ) == k and 2*best_D( best ) <= DIVERSION_SWEEP_NM: done = True
+            if not done:
+                best, done = self.closest_diversions( checkpoints, i, AirportIndex.nearest( airport_index, checkpoints[i]['lat'], checkpoints[i]['lon'],
+                                                                                            runway_length_min, 200.0 ), k )
+            for rank, (did, c, runway) in enumerate( best, 1 ):
+                info = rawdata[did]
+                summary = self.planner.diversion_summary( did )
+                diversions.append( Diversion( checkpoint=  checkpoints[i]['name'],
+                                              along=       checkpoints[i]['along'],
+                                              rank=        rank,
+                                              id=          did,
+                                              name=        info['name'],
+                                              from_city=   info['from_city'] if 'from_city' in info else '',
+                                              lat=         info['lat'],
+                                              lon=         info['lon'],
+                                              elevation=   info['elevation'],
+                                              public=      summary['public'],
+                                              towered=     summary['towered'],
+                                              ctaf_freq=   info['ctaf_freq'],
+                                              unicom_freq= info['unicom_freq'],
+                                              runway=      runway_info( runway ),
+                                              CH=          c['CH'],
+                                              D=           c['D'],
+                                              ETE=         c['ETE'],
+                                              segment=     c ) )
+        return diversions
+
+    def diversion_filters( self ):
+        return self.memo( 'diversion_filters', diversion_filters, self.opts )
+
+    def diversion_runway( self, id ):
+        # the longest runway at id that passes the diversion filters, or None
+        runways = self.memo( 'diversion_runways', dict )
+        if id not in runways:
+            runway_filters, airport_filters, _ = self.diversion_filters()
+            summary = self.planner.diversion_summary( id )
+            runways[id] = None
+            if all( f( summary ) for f in airport_filters ):
+                for r in summary['runways']:
+                    if all( f( r ) for f in runway_filters ):
+                        runways[id] = r['runway']
+                        break
+        return runways[id]
+
+    def closest_diversions( self, checkpoints, i, near, k ):
+        # returns up to k (id, segment, runway) with the best ETEs from checkpoint i among the (dist, id)
+        # in near that pass the diversion filters, best first, and whether the search stopped before near ran out
+        rawdata = self.rawdata
+        runway = self.opts['runway']
+        id = checkpoints[i]['id']
+        best = []
+        for dist, did in near:
+            if len( best ) == k and dist >= (2*best_D( best )): return best, True
+            if did == id: continue
+            did_runway = self.diversion_runway( did )
+            if did_runway is None: continue
+            to = checkpoints[i].copy()
+            to['id']  = did
+            to['lat'] = rawdata[did]['lat']
+            to['lon'] = rawdata[did]['lon']
+            c = self.calc_segment( checkpoints[i], to, i, runway )
+            if len( best ) < k or c['ETE'] < best[-1][1]['ETE']:
+                best.append( (did, c, did_runway) )
+                best.sort( key=lambda b: b[1]['ETE'] )
+                del best[k:]
+        return best, False
+
+    #--------------------------------------------------------------
+    # Airports Along the Route
+    #--------------------------------------------------------------
+    def corridor( self ):
+        return self.memo( 'corridor', self.calc_corridor )
+
+    def calc_corridor( self ):
+        # every airport within corridor_nm of each leg, in order along the leg
+        rawdata = self.rawdata
+        route = self.route
+        airport_index = self.planner.index()
+        found = []
+        for i in range(1, len(route)):
+            fm = route[i-1]
+            to = route[i]
+            for along, abeam, dist, id in AirportIndex.corridor( airport_index, fm['lat'], fm['lon'], to['lat'], to['lon'],
+                                                                 self.opts['corridor_nm'], self.opts['runway_length_min'] ):
+                info = rawdata[id]
+                longest = AirportStore.runway_summary( info )['longest']
+                found.append( CorridorAirport( i, fm['name'], to['name'], id, info['name'], along, abeam, dist,
+                                               info['runways'][longest]['length'] if longest >= 0 else 0 ) )
+        return found
+
+    #--------------------------------------------------------------
+    # Glide Coverage
+    #
+    # Every glide_step_nm along each leg, at the leg's planned ia, which airports could be
+    # reached power-off at Vg, arriving glide_margin_ft above the field, with the leg's wind.
+    # Still air, the aircraft covers best_glide_ratio nm for each 1000 ft above the field.
+    # The wind stretches or shrinks that by the ground speed toward the airport over the TAS.
+    #
+    # Nothing is in range past the still-air range above sea level times (TAS+WS)/TAS, so
+    # that is how far off the leg AirportIndex.sweep() looks, and each point measures just
+    # the airports around it.
+    #--------------------------------------------------------------
+    def glide( self ):
+        return self.memo( 'glide', self.calc_glide )
+
+    def calc_glide( self ):
+        opts = self.opts
+        type_info = self.type_info
+        if 'Vg' not in type_info or 'best_glide_ratio' not in type_info: raise PlanError( f'glide coverage needs Vg and best_glide_ratio for {opts["t"]}' )
+        if opts['glide_step_nm'] <= 0: raise PlanError( f'glide_step_nm must be more than 0, not {opts["glide_step_nm"]}' )
+        Vg     = type_info['Vg']
+        ratio  = type_info['best_glide_ratio']
+        margin = opts['glide_margin_ft']
+        step   = opts['glide_step_nm']
+        airport_index = self.planner.index()
+        ids   = airport_index['ids']
+        lats  = airport_index['lats']
+        lons  = airport_index['lons']
+        elevs = airport_index['elevations']
+        route = self.route
+        segments = []
+        in_ranges = []                  # ids in range along each segment, in order
+        covered_nm = 0.0
+        along = 0.0
+        for i in range(1, len(route)):
+            fm = route[i-1]
+            to = route[i]
+            D = Geodesic.distance( fm['lat'], fm['lon'], to['lat'], to['lon'] )
+            if D == 0: continue
+            IA  = to['ia']
+            TAS = calc_TAS( self.calc_CAS( Vg, 0 ), calc_DA( calc_PA( IA, to['alt'] ), to['oat'] ) )
+            WS  = to['wind_speed']
+            WA  = to['wind_dir'] + 180
+            # farthest reach to any airport, which can be below sea level (e.g., Death Valley)
+            reach_max = max( 0.0, IA - min( airport_index['elevation_min'], 0 ) - margin ) / 1000.0 * ratio * (TAS + WS) / TAS
+
+            ds = [ k*step for k in range(ceil( D / step )) ]
+            a = Geodesic.initial_bearing( fm['lat'], fm['lon'], to['lat'], to['lon'] ) * DEG_TO_RAD
+            plats, plons = Geodesic.destination_many( fm['lat'], fm['lon'], a, ds, True )
+            if reach_max > 0:
+                sweep = AirportIndex.sweep( airport_index, fm['lat'], fm['lon'], to['lat'], to['lon'], ds, plats, plons,
+                                            reach_max, opts['runway_length_min'], points=True )
+            else:
+                sweep = ( [] for d in ds )
+            for k, found in enumerate( sweep ):
+                bearings = Geodesic.initial_bearing_many( plats[k], plons[k], [ lats[j] for _, j in found ], [ lons[j] for _, j in found ] )
+                in_range = []
+                for (dist, j), b in zip( found, bearings ):
+                    h = IA - elevs[j] - margin
+                    if h <= 0: continue
+                    WTA = DEG_TO_RAD*(b - WA)
+                    x = WS * sin( WTA ) / TAS
+                    if x*x >= 1.0: continue
+                    GS = TAS*sqrt( 1.0 - x*x ) + WS*cos( WTA )
+                    if GS > 0 and dist <= h / 1000.0 * ratio * GS / TAS: in_range.append( ids[j] )
+                start = along + ds[k]
+                end   = along + min( ds[k] + step, D )
+                covered = len( in_range ) > 0
+                if covered: covered_nm += end - start
+                last = segments[-1] if len( segments ) > 0 else None
+                if last is not None and last.leg == i and last.covered == covered:
+                    last.end = end
+                else:
+                    segments.append( GlideSegment( i, fm['name'], to['name'], start, end, covered, '' ) )
+                    in_ranges.append( {} )
+                for id in in_range: in_ranges[-1][id] = True
+            along += D
+        for segment, in_range in zip( segments, in_ranges ): segment.airports = ' '.join( in_range )
+        return Glide( Vg, ratio, margin, step, covered_nm, along, segments )
+
+    #--------------------------------------------------------------
+    # Airport Information
+    #--------------------------------------------------------------
+    def airports( self ):
+        return self.memo( 'airports', self.calc_airports )
+
+    def calc_airports( self ):
+        # route airports, then alternates, then diversion airports if asked for
+        rawdata = self.rawdata
+        ids = []
+        def add_airport( id ):
+            if id == '' or id not in rawdata or id in ids: return
+            ids.append( id )
+        for cp in self.route: add_airport( cp['id'] )
+        for al in self.opts['alternate']: add_airport( al )
+        if self.opts['show_diversion_detail']:
+            for dv in self.diversions(): add_airport( dv.id )
+
+        airports = []
+        for id in ids:
+            info = rawdata[id]
+            freqs = []
+            for f in info['freqs']:
+                freq = f['freq']
+                if freq == '' or freq[0] != '1': continue
+                freqs.append( Frequency( f['kind'], freq, f['remarks'], f.get( 'telephone' ) ) )
+            navaids = []
+            for n in info['navaids']:
+                freq = n['freq']
+                if freq == '' or freq[0] != '1': continue
+                kind = n['kind']
+                if kind != 'VOR' and kind != 'VORTAC' and kind != 'VOR/DME' and kind != 'TACAN': continue
+                navaids.append( Navaid( kind, n['id'], n['name'], freq, n['distance'], n['bearing'], n['remarks'], get_morse_code( n['id'] ) ) )
+            airports.append( AirportInfo( id, info['name'], info['from_city'] if 'from_city' in info else '', info['elevation'],
+                                          [ runway_info( r ) for r in info['runways'] ], freqs, navaids ) )
+        return airports
@@ -0,0 +1,230 @@
+# Report.py - writes a Planner.PlanResult
+#
+#     text   the way fp.py always has
+#     json   JSON Lines, one object per record
+#     csv    one row per record, with a header row at the start of each section
+#
+# json and csv come from the same records, which carry the computed fields as plain numbers
+# and strings (nothing rounded), section by section in the same order as the text:
+#
+#     weight_balance   item, weight, arm, moment     (empty .. baggage2, total, no_fuel)
+#     check            name, ok, message             (W&B checks)
+#     navlog           route (outbound/return), then the navlog columns: name, lat, lon, TC, ..., DTOT, ETA, REM
+#     fuel_check       route, fuel_time_left_hr, fuel_time_left_min_hr, ok, message
+#     short_field      kind (TAKEOFF/LANDING), id, weight, PA, elevation, altimeter, oat, roll, clear50,
+#                      runway, length, headwind, crosswind
+#     diversion        checkpoint, along, rank, id, name, ..., runway_*, CH, D, ETE and the rest of calc_segment()
+#     corridor         leg, leg_from, leg_to, id, name, along, abeam, distance, length
+#     glide            Vg, ratio, margin_ft, step_nm, covered_nm, total_nm
+#     glide_segment    leg, leg_from, leg_to, start, end, covered, airports
+#     airport          id, name, from_city, elevation
+#     runway           airport, id, length, width, pattern, condition
+#     freq             airport, kind, freq, telephone, remarks
+#     navaid           airport, kind, id, name, freq, distance, bearing, remarks, morse
+#
+# Every json object and csv row starts with its section, then any extra fields the caller
+# adds (e.g., the batch line number), then the record.
+#
+import sys
+import csv
+import json
+import dataclasses
+
+FORMATS = [ 'text', 'json', 'csv' ]
+
+def write( result, format='text', out=sys.stdout, extra={} ):
+    if format == 'text':
+        text( result, out )
+    else:
+        write_records( records( result ), format, out, extra )
+
+def error( msg, format='text', out=sys.stdout, extra={} ):
+    if format == 'text':
+        print( f'ERROR: {msg}', file=out )
+    else:
+        write_records( [ ('error', { 'error': msg }) ], format, out, extra )
+
+def write_records( recs, format, out, extra ):
+    if format == 'json':
+        for section, rec in recs:
+            out.write( json.dumps( { 'section': section, **extra, **rec } ) )
+            out.write( '\n' )
+    else:
+        w = csv.writer( out, lineterminator='\n' )
+        last = None
+        for section, rec in recs:
+            if section != last:
+                w.writerow( [ 'section', *extra.keys(), *rec.keys() ] )
+                last = section
+            w.writerow( [ section, *extra.values(), *rec.values() ] )
+
+#--------------------------------------------------------------
+# Records
+#--------------------------------------------------------------
+def records( result ):
+    # each section's records come together, so csv gets one header per section;
+    # sections that weren't planned (None) are left out
+    wb = result.weight_balance
+    if wb is not None:
+        for item in [ 'empty', 'fuel', 'row1', 'row2', 'baggage1', 'baggage2', 'total', 'no_fuel' ]:
+            yield ('weight_balance', { 'item': item, **dataclasses.asdict( getattr( wb, item ) ) })
+        for check in wb.checks:
+            yield ('check', dataclasses.asdict( check ))
+    for navlog in result.navlogs or []:
+        for leg in navlog.legs:
+            yield ('navlog', { 'route': navlog.kind, **dataclasses.asdict( leg ) })
+    for navlog in result.navlogs or []:
+        yield ('fuel_check', { 'route': navlog.kind, 'fuel_time_left_hr': navlog.fuel_time_left_hr,
+                               'fuel_time_left_min_hr': navlog.fuel_time_left_min_hr, 'ok': navlog.check.ok, 'message': navlog.check.message })
+    if result.takeoff is not None:
+        for sf in [result.takeoff, result.landing]:
+            yield ('short_field', dataclasses.asdict( sf ))
+    for d in result.diversions or []:
+        rec = dataclasses.asdict( d )
+        runway  = rec.pop( 'runway' )
+        segment = rec.pop( 'segment' )
+        for key in runway: rec[f'runway_{key}'] = runway[key]
+        for key in segment:
+            if key not in rec: rec[key] = segment[key]
+        yield ('diversion', rec)
+    for c in result.corridor or []:
+        yield ('corridor', dataclasses.asdict( c ))
+    g = result.glide
+    if g is not None:
+        yield ('glide', { key: getattr( g, key ) for key in [ 'Vg', 'ratio', 'margin_ft', 'step_nm', 'covered_nm', 'total_nm' ] })
+        for segment in g.segments:
+            yield ('glide_segment', dataclasses.asdict( segment ))
+    airports = result.airports or []
+    for a in airports:
+        yield ('airport', { 'id': a.id, 'name': a.name, 'from_city': a.from_city, 'elevation': a.elevation })
+    for a in airports:
+        for r in a.runways:  yield ('runway', { 'airport': a.id, **dataclasses.asdict( r ) })
+    for a in airports:
+        for f in a.freqs:    yield ('freq',   { 'airport': a.id, **dataclasses.asdict( f ) })
+    for a in airports:
+        for n in a.navaids:  yield ('navaid', { 'airport': a.id, **dataclasses.asdict( n ) })
+
+#--------------------------------------------------------------
+# Text
+#--------------------------------------------------------------
+
+def text( result, out=sys.stdout ):
+    # sections that weren't planned (None) are left out
+    if result.weight_balance is not None: text_weight_balance( result.weight_balance, out )
+    if result.navlogs is not None:
+        for navlog in result.navlogs: text_navlog( navlog, out )
+    if result.takeoff is not None:        text_short_field( result.takeoff, result.landing, out )
+    if result.diversions is not None:     text_diversions( result.runway_length_min, result.diversion_filter, result.diversions, out )
+    if result.corridor is not None:       text_corridor( result.corridor_nm, result.runway_length_min, result.corridor, out )
+    if result.glide is not None:          text_glide( result.glide, out )
+    if result.airports is not None:       text_airports( result.airports, out )
+
+def text_weight_balance( wb, out ):
+    p = lambda s='': print( s, file=out )
+    p()
+    p( f'Weight and Balance for {wb.weight_for}' )
+    p()
+    p( f'Item                      Weight    Arm     Moment' )
+    p( f'--------------------------------------------------' )
+    for label, it in [ ('Empty Aircraft:          ',             wb.empty),
+                       (f'Main Fuel ({wb.fuel_gal:2.0f} Gallons):  ', wb.fuel),
+                       ('Seating Row 1:           ',             wb.row1),
+                       ('Seating Row 2:           ',             wb.row2),
+                       ('Area 1 Baggage:          ',             wb.baggage1),
+                       ('Area 2 Baggage:          ',             wb.baggage2) ]:
+        p( f'{label} {it.weight:6.1f} {it.arm:6.2f}  {it.moment:9.2f}' )
+    p( f'--------------------------------------------------' )
+    p( f'Total:                    {wb.total.weight:6.1f} {wb.total.arm:6.2f}  {wb.total.moment:9.2f}' )
+    p()
+    for check in wb.checks: p( check.message )
+
+def text_navlog( navlog, out ):
+    p = lambda s='': print( s, file=out )
+    p()
+    p()
+    p( f'CHECKPOINT         LAT    LON  TC   IA   ALT  WD WS OAT   IAS CAS TAS   WCA  TH MV  MH DEV  CH       D  DTOT    GS   ETE   ETA      GPH  GAL  REM' )
+    p( f'-------------------------------------------------------------------------------------------------------------------------------------------------' )
+    for l in navlog.legs:
+        p( f'{l.name:15s} {l.lat:6.2f} {l.lon:6.2f} {l.TC:3.0f} {l.IA:4.0f} {l.ALT:5.2f} {l.WD:3.0f} {l.WS:2.0f} {l.OAT:3.0f}   {l.IAS:3.0f} {l.CAS:3.0f} {l.TAS:3.0f}   {l.WCA:3.0f} {l.TH:3.0f} {l.MV:2.0f} {l.MH:3.0f} {l.DEV:3.0f} {l.CH:3.0f}   {l.D:5.1f} {l.DTOT:5.1f} {l.GS:5.1f} {l.ETE:5.1f} {l.ETA:5.1f}     {l.GPH:4.1f} {l.GAL:4.1f} {l.REM:4.1f}' )
+    p()
+    p( navlog.check.message )
+
+def text_short_field( takeoff, landing, out ):
+    p = lambda s='': print( s, file=out )
+    p()
+    p()
+    p( f'Short-Field Takeoff and Landing Distances' )
+    p( f'-----------------------------------------' )
+    for sf in [takeoff, landing]:
+        p()
+        p( f'{sf.id} short-field {sf.kind} with {sf.weight:.0f} lb, {sf.PA:.0f} ft pressure altitude (elevation={sf.elevation}, altimeter={sf.altimeter}), and {sf.oat}C' )
+        p( f'        ground roll:                           {sf.roll:5.0f} ft' )
+        p( f'        length to clear 50 ft obstacle:        {sf.clear50:5.0f} ft' )
+
+def text_diversions( runway_length_min, diversion_filter, diversions, out ):
+    p = lambda s='': print( s, file=out )
+    p()
+    p()
+    p( f'Closest Diversions (with runway >= {runway_length_min} ft{", " if diversion_filter else ""}{diversion_filter or ""})' )
+    p( '-------------------------------------------' )
+    p()
+    p( f'Note: these diversions do not yet account for time required to turn to the diversion\'s compass heading (CH)' )
+    p()
+    p( f'CHECKPOINT         ICAO   CH    D  ETE ELEV PUBL    CTAF  LONGEST LENGTH WIDTH PATT   COND  NAME                           NEAR CITY' )
+    p( f'---------------------------------------------------------------------------------------------------------------------------------------------------------------' )
+    for d in diversions:
+        r = d.runway
+        public = 'Y' if d.public else 'N'
+        p( f'{d.checkpoint:15s}    {d.id:4}  {d.CH:3.0f} {d.D:4.1f} {d.ETE:4.1f} {d.elevation:4.0f}  {public:1s}   {d.ctaf_freq:7s}  {r.id:7s}  {r.length:5.0f}  {r.width:4.0f}  {r.pattern} {r.condition:6s}  {d.name:30s} {d.from_city}' )
+
+def text_corridor( corridor_nm, runway_length_min, corridor, out ):
+    p = lambda s='': print( s, file=out )
+    p()
+    p()
+    p( f'Airports Within {corridor_nm} nm of the Route (with runway >= {runway_length_min} ft)' )
+    p( '---------------------------------------------------------------' )
+    p()
+    p( f'LEG                               ICAO   ALONG  ABEAM LENGTH  NAME' )
+    p( f'-------------------------------------------------------------------------------------------' )
+    for c in corridor:
+        leg = f'{c.leg_from.strip()} -> {c.leg_to.strip()}'
+        side = 'R' if c.abeam >= 0 else 'L'
+        p( f'{leg:33s} {c.id:5s}  {c.along:6.1f} {abs( c.abeam ):5.1f}{side} {c.length:6.0f}  {c.name}' )
+
+def text_glide( g, out ):
+    p = lambda s='': print( s, file=out )
+    p()
+    p()
+    p( f'Glide Coverage ({g.ratio} nm per 1000 ft at {g.Vg:.0f} KIAS, arriving {g.margin_ft:.0f} ft above the field)' )
+    p( '------------------------------------------------------------------------------' )
+    p()
+    p( f'LEG                                FROM     TO  COVERED  AIRPORTS IN RANGE' )
+    p( f'-------------------------------------------------------------------------------------------' )
+    for s in g.segments:
+        leg = f'{s.leg_from.strip()} -> {s.leg_to.strip()}'
+        covered = 'YES' if s.covered else '!!! NO'
+        p( f'{leg:33s} {s.start:6.1f} {s.end:6.1f}  {covered:7s}  {s.airports}' )
+    p()
+    pct = 100.0 * g.covered_nm / g.total_nm if g.total_nm > 0 else 100.0
+    p( f'Covered: {g.covered_nm:.1f} of {g.total_nm:.1f} nm ({pct:.0f}%), checked every {g.step_nm} nm' )
+
+def text_airports( airports, out ):
+    p = lambda s='': print( s, file=out )
+    p()
+    p()
+    p( 'Airport Information' )
+    p( '-------------------' )
+    for a in airports:
+        p()
+        p( f'{a.id}:' )
+        p( f'    NAME       {a.name:25s} {a.from_city}' )
+        p( f'    ELEVATION                            {a.elevation}' )
+        for r in a.runways:
+            lxw = f'{r.length} x {r.width}'
+            p( f'    RUNWAY     {r.id:10s}                {lxw:12}    {r.pattern:3}        {r.condition:10s}' )
+        for f in a.freqs:
+            remarks = f.remarks
+            if f.telephone is not None: remarks = f.telephone + '  ' + remarks
+            p( f'    {f.kind:36s} {f.freq:15s} {remarks}' )
+        for n in a.navaids:
+            p( f'    {n.kind:10s} {n.id:4} {n.name:20s} {n.freq:15s} {n.distance:10s} FROM {n.bearing:8s} {n.morse:15s} {n.remarks}' )
@@ -0,0 +1,164 @@
+# Service.py - long-running planning service over HTTP/JSON
+#
+#     ./fp.py -serve 8080 -jobs 4
+#
+#     POST /plan           body is a plan spec (JSON, see Planner.py)
+#                          200 { "ok": true,  "plan": <PlanResult> }
+#                          400 { "ok": false, "error": "..." } for a bad spec
+#     POST /plan?format=text   the same plan printed the way fp.py prints it
+#     POST /plan?format=csv    the plan's records as CSV (see Report.py), other formats are a 400
+#     POST /plan?sections=navlog,short_field   plans just those sections (see Planner.SECTIONS)
+#     GET  /stats          request counts and latencies so far
+#
+# Every response has X-Plan-Ms (time spent planning) and X-Latency-Ms (time from request
+# to response, including any wait for a free worker) headers, and each request is logged
+# to stderr with its latency.
+#
+# The Planner is set up and warmed (airport store, spatial index, magvar grid, compiled
+# aircraft) before the worker processes are forked, so every request starts warm and the
+# workers share those pages.  Requests are taken on threads and each one waits for a
+# worker, so -jobs plans run at a time.  With -jobs 1 the plans run on the request threads.
+#
+import sys
+import signal
+import io
+import json
+import time
+import threading
+import multiprocessing
+import dataclasses
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import AirportStore
+import Planner
+import Report
+
+BODY_MAX = 1 << 20              # largest plan spec accepted, in bytes
+
+planner = None
+
+def worker_init( magvar_cof, magvar_cache ):
+    # only needed where workers are spawned rather than forked
+    global planner
+    if planner is None:
+        planner = Planner.Planner( AirportStore.load( 'rawdata' ), magvar_cof, magvar_cache )
+        planner.warm()
+
+def plan_request( body, format, sections ):
+    # returns (HTTP status, content type, response body, planning ms)
+    start = time.perf_counter()
+    try:
+        spec = json.loads( body )
+        result = planner.plan( spec, sections )
+        if format == 'text' or format == 'csv':
+            out = io.StringIO()
+            Report.write( result, format, out )
+            status, type, text = 200, f'text/{"plain" if format == "text" else "csv"}; charset=utf-8', out.getvalue()
+        else:
+            status, type, text = 200, 'application/json', json.dumps( { 'ok': True, 'plan': dataclasses.asdict( result ) } )
+    except (json.JSONDecodeError, UnicodeDecodeError, Planner.PlanError) as e:
+        status, type, text = 400, 'application/json', json.dumps( { 'ok': False, 'error': str( e ) } )
+    except Exception as e:
+        status, type, text = 500, 'application/json', json.dumps( { 'ok': False, 'error': f'{e.__class__.__name__}: {e}' } )
+    return status, type, text.encode( 'utf-8' ), (time.perf_counter() - start) * 1000.0
+
+class Stats:
+    # request counts and latencies, updated from the request threads
+
+    def __init__( self ):
+        self.lock       = threading.Lock()
+        self.started    = time.time()
+        self.requests   = 0
+        self.errors     = 0
+        self.latency_ms = 0.0               # total, for the mean
+        self.latency_max_ms = 0.0
+        self.plan_ms    = 0.0
+
+    def add( self, status, latency_ms, plan_ms ):
+        with self.lock:
+            self.requests += 1
+            if status != 200: self.errors += 1
+            self.latency_ms += latency_ms
+            self.latency_max_ms = max( self.latency_max_ms, latency_ms )
+            self.plan_ms += plan_ms
+
+    def report( self ):
+        with self.lock:
+            n = max( 1, self.requests )
+            return { 'uptime_s':        time.time() - self.started,
+                     'requests':        self.requests,
+                     'errors':          self.errors,
+                     'latency_mean_ms': self.latency_ms / n,
+                     'latency_max_ms':  self.latency_max_ms,
+                     'plan_mean_ms':    self.plan_ms / n }
+
+class Handler( BaseHTTPRequestHandler ):
+    server_version = 'fp.py'
+
+    def do_POST( self ):
+        start = time.perf_counter()
+        url = urlsplit( self.path )
+        if url.path != '/plan': return self.reply( start, 404, 'application/json', b'{"ok": false, "error": "not found"}' )
+        try:
+            length = int( self.headers.get( 'Content-Length', '0' ) )
+        except ValueError:
+            return self.reply( start, 400, 'application/json', b'{"ok": false, "error": "bad Content-Length"}' )
+        if length < 0 or length > BODY_MAX: return self.reply( start, 413, 'application/json', b'{"ok": false, "error": "plan spec too large"}' )
+        body = self.rfile.read( length )
+        query = parse_qs( url.query )
+        format = query.get( 'format', ['json'] )[0]
+        if format not in Report.FORMATS:
+            error = f'unknown format {format} (known formats: {" ".join( Report.FORMATS )})'
+            return self.reply( start, 400, 'application/json', json.dumps( { 'ok': False, 'error': error } ).encode( 'utf-8' ) )
+        sections = query['sections'][0].split( ',' ) if 'sections' in query else Planner.DEFAULT_SECTIONS
+        if self.server.pool is None:
+            status, type, data, plan_ms = plan_request( body, format, sections )
+        else:
+            status, type, data, plan_ms = self.server.pool.apply( plan_request, (body, format, sections) )
+        self.reply( start, status, type, data, plan_ms )
+
+    def do_GET( self ):
+        start = time.perf_counter()
+        if urlsplit( self.path ).path != '/stats': return self.reply( start, 404, 'application/json', b'{"ok": false, "error": "not found"}' )
+        self.reply( start, 200, 'application/json', json.dumps( self.server.stats.report() ).encode( 'utf-8' ) )
+
+    def reply( self, start, status, type, data, plan_ms=0.0 ):
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        self.send_response( status )
+        self.send_header( 'Content-Type', type )
+        self.send_header( 'Content-Length', str( len( data ) ) )
+        self.send_header( 'X-Plan-Ms', f'{plan_ms:.2f}' )
+        self.send_header( 'X-Latency-Ms', f'{latency_ms:.2f}' )
+        self.end_headers()
+        self.wfile.write( data )
+        if self.command == 'POST': self.server.stats.add( status, latency_ms, plan_ms )
+        sys.stderr.write( f'{self.address_string()} {self.command} {self.path} {status} {latency_ms:.1f} ms (plan {plan_ms:.1f} ms)\n' )
+
+    def log_request( self, code='-', size='-' ):
+        pass                            # reply() logs with the latency instead
+
+def stop( signum, frame ):
+    raise KeyboardInterrupt
+
+def serve( host, port, jobs, magvar_cof='', magvar_cache='' ):
+    global planner
+    planner = Planner.Planner( AirportStore.load( 'rawdata' ), magvar_cof, magvar_cache )
+    planner.warm()
+    server = ThreadingHTTPServer( (host, port), Handler )
+    server.daemon_threads = True
+    server.stats = Stats()
+    server.pool = None
+    if jobs > 1:
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context( 'fork' if 'fork' in methods else None )
+        server.pool = ctx.Pool( jobs, worker_init, (magvar_cof, magvar_cache) )
+    signal.signal( signal.SIGTERM, stop )     # after the fork, so the workers keep the default
+    sys.stderr.write( f'planning on http://{host}:{port}/plan with {jobs} worker(s)\n' )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if server.pool is not None: server.pool.terminate()
+        planner.save_magvar_grid()
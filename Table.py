@@ -0,0 +1,126 @@
+# Table.py - compiled lookup tables for the performance data in Aircraft.py
+#
+# Aircraft.py writes tables the way they appear in the POH:
+#
+#     flat:    [ [ a, b1, b2, ... ], ... ]                                e.g., normal_cg, magnetic_deviation
+#     nested:  [ [ aa, [ [ a, [ [ x, b1, b2, ... ], ... ] ], ... ] ], ... ]   e.g., short_field_takeoff
+#
+# compile() sorts each axis once and lookup() then finds the bracketing rows with bisect,
+# so a lookup costs O(log n) per axis instead of a scan of every row.  Nested tables are
+# interpolated one axis at a time, and the sub-tables need not share the same axis values.
+#
+# What happens outside the table is explicit for each table:
+#
+#     below/above = 'clamp'         use the first/last row
+#     below/above = 'extrapolate'   extend the line through the first/last two rows
+#
+# The defaults (clamp below, extrapolate above) are what fp.py has always done.
+#
+# A periodic axis (e.g., compass headings with period=360) wraps around instead, so a
+# heading between the last row and 360 is interpolated toward the first row.  value_period
+# says how much the values wrap by (360 for deviation cards, whose values are headings too).
+#
+from bisect import bisect_right
+from math import floor, ceil
+from array import array
+
+def compile( rows, below='clamp', above='extrapolate', period=0, value_period=0 ):
+    if len( rows ) == 0: raise ValueError( 'empty table' )
+    if below not in ('clamp', 'extrapolate') or above not in ('clamp', 'extrapolate'):
+        raise ValueError( f'unknown table policy: below={below} above={above}' )
+    nested = isinstance( rows[0][1], list )
+    points = []
+    for row in rows:
+        a = row[0]
+        if nested:
+            b = compile( row[1], below, above )
+        else:
+            b = list( row[1:] )
+            if period != 0 and a >= period: b = [ v - value_period for v in b ]
+        if period != 0: a = a % period
+        points.append( (a, b) )
+    points.sort( key=lambda p: p[0] )
+    if period != 0:
+        if nested: raise ValueError( 'periodic axes are only supported for flat tables' )
+        a, b = points[0]
+        points.append( (a + period, [ v + value_period for v in b ]) )
+    return { 'axis':    [ p[0] for p in points ],
+             'values':  [ p[1] for p in points ],
+             'nested':  nested,
+             'below':   below,
+             'above':   above,
+             'period':  period,
+             'value_period': value_period }
+
+def lookup( table, *coords ):
+    #--------------------------------------------------------------
+    # Returns the list of interpolated b columns at coords, which
+    # has one coordinate per table level (outermost first).
+    #--------------------------------------------------------------
+    x = coords[0]
+    axis   = table['axis']
+    values = table['values']
+    period = table['period']
+    if period != 0:
+        x = x % period
+        if x < axis[0]: x += period
+    n = len( axis )
+    if n == 1: return value( table, 0, coords )
+    i = bisect_right( axis, x ) - 1
+    if i < 0:
+        i = 0
+    elif i > n-2:
+        i = n-2
+    a0 = axis[i]
+    a1 = axis[i+1]
+    if a0 == a1: return value( table, i, coords )
+    f = (x - a0) / (a1 - a0)
+    if f < 0 and table['below'] == 'clamp': f = 0
+    if f > 1 and table['above'] == 'clamp': f = 1
+    if f == 0: return value( table, i, coords )
+    if f == 1: return value( table, i+1, coords )
+    b0 = value( table, i,   coords )
+    b1 = value( table, i+1, coords )
+    return [ (1-f)*v0 + f*v1 for v0, v1 in zip( b0, b1 ) ]
+
+def value( table, i, coords ):
+    if table['nested']: return lookup( table['values'][i], *coords[1:] )
+    return table['values'][i]
+
+# Cards
+#
+# For the tables that get looked up on every segment and diversion candidate (CAS, compass
+# deviation), card() samples one column of a flat table at every whole unit of its axis
+# (every knot, every degree) and card_lookup() interpolates between the two neighboring
+# samples by indexing.  When the table rows are on whole units, as they are in Aircraft.py,
+# that gives the same line segments as lookup() without any search.  Queries outside the
+# sampled range go to lookup() so the table's clamp/extrapolate policy still applies.
+#
+def card( table, col=0 ):
+    if table['nested']: raise ValueError( 'cards are only supported for flat tables' )
+    axis   = table['axis']
+    period = table['period']
+    if period != 0:
+        lo = 0
+        values = array( 'd', [ lookup( table, x )[col] for x in range(period) ] )
+        values.append( values[0] + table['value_period'] )
+    else:
+        lo = floor( axis[0] )
+        values = array( 'd', [ lookup( table, x )[col] for x in range(lo, ceil( axis[-1] )+1) ] )
+    return { 'table':  table,
+             'col':    col,
+             'lo':     lo,
+             'period': period,
+             'values': values }
+
+def card_lookup( card, x ):
+    if card['period'] != 0: x = x % card['period']
+    values = card['values']
+    k = x - card['lo']
+    i = int( k )
+    if k < 0 or i >= len( values )-1:
+        if k == len( values )-1: return values[i]
+        return lookup( card['table'], x )[card['col']]
+    f = k - i
+    if f == 0: return values[i]
+    return (1-f)*values[i] + f*values[i+1]
@@ -6,11 +6,22 @@
 # it into a file called rawdata.dat which is saved in the repository occasionally.   
 #
 import os
+import sys
 import subprocess
 import time
+import random
+import threading
+import urllib.request
+import http.client
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from html.parser import HTMLParser
 import csv
 import pickle
+import hashlib
 import re
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), '..' ) )
+import AirportStore
+import MagVar
 
 def die( msg ):
     print( f'ERROR: {msg}' )
@@ -27,16 +38,55 @@ def cmd( c ):
     else:
         return ''
 
-m = None 
-def match( s, pattern ): 
-    global m
-    m = re.compile( pattern ).match( s )
-    return m
-
 def subst( s, pattern, subst ):
     return re.sub( pattern, subst, s )
 
+#--------------------------------------------------------------
+# Parse Arguments
+#--------------------------------------------------------------
+faa_url       = 'https://nfdc.faa.gov/nfdcApps/services/ajv5/airportDisplay.jsp?airportId='
+fetch_jobs    = 8               # concurrent requests to faa_url
+fetch_rate    = 4.0             # max requests started per second, across all jobs
+fetch_retries = 10              # attempts per page before giving up on it (until the next run)
+fetch_timeout = 60              # seconds
+parse_jobs    = os.cpu_count() or 1     # worker processes for parsing
+parse_chunk   = 500             # facilities per worker task
+incremental   = False           # only redo facilities that changed since the last build
+
+i = 1
+while i < len( sys.argv ):
+    arg = sys.argv[i]
+    i += 1
+    if arg == '-faa_url':
+        faa_url = sys.argv[i]
+        i += 1
+    elif arg == '-jobs':
+        fetch_jobs = int(sys.argv[i])
+        i += 1
+    elif arg == '-rate':
+        fetch_rate = float(sys.argv[i])
+        i += 1
+    elif arg == '-retries':
+        fetch_retries = int(sys.argv[i])
+        i += 1
+    elif arg == '-timeout':
+        fetch_timeout = float(sys.argv[i])
+        i += 1
+    elif arg == '-parse_jobs':
+        parse_jobs = int(sys.argv[i])
+        i += 1
+    elif arg == '-incremental':
+        incremental = int(sys.argv[i])
+        i += 1
+    else:
+        die( f'unknown option: {arg}' )
+
+# Bump this whenever parse_facility() or the record layout changes, so the next
+# incremental build starts over instead of keeping records made the old way.
+PARSER_VERSION = 1
+
 rawdata = {}
+manifest = { 'version': PARSER_VERSION, 'cycle': '', 'hashes': {}, 'no_page': [] }    # written to rawdata.manifest for the next incremental build
 
 def download():
     # TODO: we currently manually download the files
@@ -49,88 +99,265 @@ def latlon_to_decimal( latlon ):
     if ch == 'S' or ch == 'W': latlon = -latlon
     return latlon
 
-def parse_faa_text( id ):
-    #--------------------------------------------------------------
-    # Download more detailed information from faa.gov, but don't 
-    # do this if we have alread done it for a particular airport.
-    # Convert html to text and write to the .faa.text.out file.
-    #--------------------------------------------------------------
-    if not os.path.exists( f'airports/{id}.faa.out' ):
-        for t in range(10):
-            time.sleep( 1 )
-            c = f'wget -O - https://nfdc.faa.gov/nfdcApps/services/ajv5/airportDisplay.jsp?airportId={id} > airports/{id}.faa.out'
-            print( c )
-            info = subprocess.run( c, shell=True, text=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT )
-            if info.returncode == 0: break
-            cmd( f'rm -f airports/{id}.faa.out' )
-            if t == 9: print( f'could not get FAA airport data for {id}' )
-    if os.path.exists( f'airports/{id}.faa.out' ) and not os.path.exists( f'airports/{id}.faa.text.out' ):
-        cmd( f'html2text airports/{id}.faa.out > airports/{id}.faa.text.out' )
+#--------------------------------------------------------------
+# Fetch detailed airport pages from faa.gov.
+#
+# Pages are cached in airports/<id>.faa.out.  A page is written to a
+# temporary file and renamed into place only when complete, so an 
+# interrupted run can simply be restarted and will pick up where it 
+# left off.  fetch_jobs requests run at once, but no more than 
+# fetch_rate are started per second in total so we stay polite.
+#--------------------------------------------------------------
+class RateLimiter:
+    def __init__( self, rate ):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next = 0.0
+        self.lock = threading.Lock()
 
-    #--------------------------------------------------------------
-    # Parse the more detailed faa.text.data information that is not
-    # available in the .csv files and insert it back into 
-    # the rawdata for this airport.  
-    #--------------------------------------------------------------
-    info = rawdata[id]
-    info['freqs'] = []
-    info['navaids'] = []
-    if not os.path.exists( f'airports/{id}.faa.text.out' ): return
+    def wait( self ):
+        with self.lock:
+            now = time.monotonic()
+            start = max( now, self.next )
+            self.next = start + self.interval
+        if start > now: time.sleep( start - now )
+
+def fetch_faa_page( id, limiter, refetch=False ):
+    path = f'airports/{id}.faa.out'
+    if os.path.exists( path ) and not refetch: return True
+    for t in range(fetch_retries):
+        limiter.wait()
+        try:
+            with urllib.request.urlopen( f'{faa_url}{id}', timeout=fetch_timeout ) as response:
+                page = response.read()
+            tmp = f'{path}.tmp'
+            out = open( tmp, 'wb' )
+            out.write( page )
+            out.close()
+            os.replace( tmp, path )
+            print( f'fetched {id}' )
+            return True
+        except (OSError, http.client.HTTPException) as e:
+            if t == fetch_retries-1: 
+                print( f'fetch of {id} failed ({e})' )
+                break
+            delay = min( 60.0, 2.0**t ) * (0.5 + random.random())        # exponential backoff with jitter
+            print( f'fetch of {id} failed ({e}), retrying in {delay:.1f} sec' )
+            time.sleep( delay )
+    print( f'could not get FAA airport data for {id}' )
+    return False
+
+def fetch_faa_pages( ids, refetch=set() ):
+    # ids in refetch are fetched again even if cached; the old page stays if that fails
+    todo = [ id for id in ids if id in refetch or not os.path.exists( f'airports/{id}.faa.out' ) ]
+    print( f'Fetching {len(todo)} of {len(ids)} FAA airport pages ({fetch_jobs} jobs, {fetch_rate} per sec)...' )
+    if len( todo ) == 0: return
+    limiter = RateLimiter( fetch_rate )
+    with ThreadPoolExecutor( max_workers=fetch_jobs ) as pool:
+        ok = list( pool.map( lambda id: fetch_faa_page( id, limiter, id in refetch ), todo ) )
+    failed = ok.count( False )
+    if failed != 0: print( f'could not get {failed} FAA airport pages, rerun to retry them' )
+
+#--------------------------------------------------------------
+# Parse the cached faa.gov html directly.
+#
+# FaaPageParser flattens the page into rows of cell text: each table
+# row becomes a list of its cells and each other block of text becomes 
+# a one-cell row.  parse_faa_page() then walks those rows to pick out
+# the information that is not available in the .csv files.
+#--------------------------------------------------------------
+FREQ_KIND_RE       = re.compile( r'^(UNICOM|CTAF|ATIS):$' )
+MULTI_FREQ_KIND_RE = re.compile( r'^(\S.*\S) (APPROACH/DEPARTURE|APPROACH|DEPARTURE|DELIVERY|GROUND|TOWER):$' )
+NAVAID_KIND_RE     = re.compile( r'^(DME|NDB|VOR/DME|VORTAC|TACAN|VOR)$' )
+WORD_RE            = re.compile( r'^\w+$' )
+SPACES_RE          = re.compile( r'\s+' )
+
+class FaaPageParser( HTMLParser ):
+    BLOCK_TAGS = { 'p', 'div', 'br', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'caption' }
+
+    def __init__( self ):
+        super().__init__( convert_charrefs=True )
+        self.rows = []
+        self.cells = None               # cells of the current table row
+        self.text = []                  # text of the current cell or block
 
-    T = open( f'airports/{id}.faa.text.out' )
+    def flush_text( self ):
+        text = SPACES_RE.sub( ' ', ''.join( self.text ) ).strip()
+        self.text = []
+        return text
+
+    def flush_block( self ):
+        text = self.flush_text()
+        if text != '': self.rows.append( [text] )
+
+    def handle_starttag( self, tag, attrs ):
+        if tag == 'tr':
+            self.flush_block()
+            self.cells = []
+        elif tag == 'td' or tag == 'th':
+            if self.cells is None: self.cells = []
+            self.text = []
+        elif tag in self.BLOCK_TAGS and self.cells is None:
+            self.flush_block()
+
+    def handle_endtag( self, tag ):
+        if tag == 'td' or tag == 'th':
+            if self.cells is not None: self.cells.append( self.flush_text() )
+        elif tag == 'tr':
+            if self.cells is not None and len( self.cells ) != 0: self.rows.append( self.cells )
+            self.cells = None
+        elif tag in self.BLOCK_TAGS and self.cells is None:
+            self.flush_block()
+
+    def handle_data( self, data ):
+        self.text.append( data )
+
+    def close( self ):
+        super().close()
+        self.flush_block()
+
+def cell( cells, i ):
+    return cells[i] if i < len( cells ) else ''
+
+def parse_faa_page( html ):
+    parser = FaaPageParser()
+    parser.feed( html )
+    parser.close()
+
+    freqs = []
+    navaids = []
+    from_city = None
     multi_freqs_kind = ''
-    while True:
-        line = T.readline()
-        if line == '': break
-
-        if multi_freqs_kind != '' and match( line, r'^\s+\|\s*(\S.*\S)\s*\|\s*(\S.*\S)\s*\|\s*(\S.*\S)?' ):
-            remarks = m.group(3)
-            if not remarks: remarks = ''
-            info['freqs'].append( { 'kind': multi_freqs_kind, 'freq': m.group(1), 'subkind': m.group(2), 'remarks': remarks } )
+    rows = parser.rows
+    r = 0
+    while r < len( rows ):
+        cells = rows[r]
+        r += 1
+        first = cells[0]
+
+        if multi_freqs_kind != '' and first == '' and cell( cells, 1 ) != '' and cell( cells, 2 ) != '':
+            freqs.append( { 'kind': multi_freqs_kind, 'freq': cells[1], 'subkind': cells[2], 'remarks': cell( cells, 3 ) } )
             continue
         multi_freqs_kind = ''
 
-        if match( line, r'^(UNICOM|CTAF|ATIS):\s*\|\s*(\S.*\S)\s*\|\s*(\S.*\S)?' ):
-            freq = m.group(2) 
+        m = FREQ_KIND_RE.match( first )
+        if m and cell( cells, 1 ) != '':
+            freq = cells[1]
             if freq == 'None': freq = ''
-            remarks = m.group(3)
-            if not remarks: remarks = ''
-            info['freqs'].append( { 'kind': m.group(1), 'freq': freq, 'remarks': remarks } )
-        elif match( line, r'^(\S.*\S) (APPROACH/DEPARTURE|APPROACH|DEPARTURE|DELIVERY|GROUND|TOWER):\s*\|\s*(\S.*\S)\s*\|\s*(\S.*\S)\s*\|\s*(\S.*\S)?' ):
+            freqs.append( { 'kind': m.group(1), 'freq': freq, 'remarks': cell( cells, 2 ) } )
+            continue
+        m = MULTI_FREQ_KIND_RE.match( first )
+        if m and cell( cells, 1 ) != '' and cell( cells, 2 ) != '':
             multi_freqs_kind = m.group( 1 ) + ' ' + m.group( 2 )
-            remarks = m.group(5)
-            if not remarks: remarks = ''
-            info['freqs'].append( { 'kind': multi_freqs_kind, 'freq': m.group(3), 'subkind': m.group(4), 'remarks': remarks } )
-        elif match( line, r'^(DME|NDB|VOR/DME|VORTAC|TACAN|VOR)\s*\|\s*(\w+)\s*\|\s*(\S.*\S)\s*\|\s*(\S.*\S)\s*\|\s*(\S.*\S)\s*\|\s*(\S.*\S)\s*\|\s*(\S.*\S)\s*\|\s*(\S.*\S)?' ):
-            remarks = m.group(8)
-            if not remarks: remarks = ''
-            info['navaids'].append( { 'kind': m.group(1), 'id': m.group(2), 'name': m.group(3), 'freq': m.group(4), 'hours': m.group(5), 
-                                      'distance': m.group(6), 'bearing': m.group(7), 'remarks': remarks } )
-        elif match( line, r'^WEATHER' ):
-            while True:
-                line = T.readline()
-                if line == '': break
-                if match( line, r'^\s*$' ): continue
-                if match( line, r'^ID' ): continue
-                if match( line, r'^\-\-' ): continue
-                if match( line, r'^(\w+)\s*\|\s*(\S.*\S)\s*\|\s*(\S.*\S)\s*\|\s*(\S.*\S)?\s*\|\s*(\S.*\S)?\s*\|\s*(\S.*\S)?' ):
-                    telephone = m.group(4)
-                    if not telephone: telephone = ''
-                    distance = m.group(5)
-                    if not distance: distance = ''
-                    remarks = m.group(6)
-                    if not remarks: remarks = ''
-                    info['freqs'].append( { 'id': m.group(1), 'kind': m.group(2), 'freq': m.group(3), 'telephone': telephone, 
-                                            'distance': distance, 'remarks': remarks } )
-                break   
-        elif match( line, r'^From city\s*\|\s*(\S.*\S)' ):
-            info['from_city'] = m.group(1)
+            freqs.append( { 'kind': multi_freqs_kind, 'freq': cells[1], 'subkind': cells[2], 'remarks': cell( cells, 3 ) } )
+            continue
+        if NAVAID_KIND_RE.match( first ) and WORD_RE.match( cell( cells, 1 ) ) and '' not in cells[2:7] and len( cells ) >= 7:
+            navaids.append( { 'kind': first, 'id': cells[1], 'name': cells[2], 'freq': cells[3], 'hours': cells[4], 
+                              'distance': cells[5], 'bearing': cells[6], 'remarks': cell( cells, 7 ) } )
+            continue
+        if first.startswith( 'WEATHER' ):
+            # first real row of the weather table that follows
+            while r < len( rows ):
+                cells = rows[r]
+                r += 1
+                first = cells[0]
+                if first == '' and len( cells ) == 1: continue
+                if first.startswith( 'ID' ): continue
+                if first.startswith( '--' ): continue
+                if WORD_RE.match( first ) and cell( cells, 1 ) != '' and cell( cells, 2 ) != '':
+                    freqs.append( { 'id': first, 'kind': cells[1], 'freq': cells[2], 'telephone': cell( cells, 3 ), 
+                                    'distance': cell( cells, 4 ), 'remarks': cell( cells, 5 ) } )
+                break
+            continue
+        if first == 'From city' and cell( cells, 1 ) != '':
+            from_city = cells[1]
+
+    return (freqs, navaids, from_city)
 
+def parse_faa_file( id ):
+    #--------------------------------------------------------------
+    # Parse the more detailed faa.gov information that is not
+    # available in the .csv files.  
+    #--------------------------------------------------------------
+    if not os.path.exists( f'airports/{id}.faa.out' ): return ([], [], None)
+    T = open( f'airports/{id}.faa.out', encoding='utf-8', errors='replace' )
+    html = T.read()
     T.close()
+    return parse_faa_page( html )
+
+def facility_id( row ):
+    id = row[len(row)-2]
+    if id == '': id = row[2].replace( "'", "" )
+    return id
+
+def parse_facility( row, runways ):
+    #--------------------------------------------------------------
+    # Build the rawdata entry for one NfdcFacilities.csv row and its
+    # runways.  This only reads files, so it can run in a worker process.
+    #--------------------------------------------------------------
+    id = facility_id( row )
+    info = { 'site':      row[0],
+             'type':      row[1],
+             'state':     row[6],
+             'city':      row[10],
+             'name':      row[11],
+             'use':       row[13],
+             'lat':       latlon_to_decimal( row[23] ),
+             'lon':       latlon_to_decimal( row[25] ),
+             'elevation': int(row[27]),
+             'unicom_freq': row[73],
+             'ctaf_freq': row[74],
+             'atct':      row[72] == 'Y',
+             'runways':   runways }
+    freqs, navaids, from_city = parse_faa_file( id )
+    info['freqs'] = freqs
+    info['navaids'] = navaids
+    if from_city is not None: info['from_city'] = from_city
+    return (id, info)
+
+def parse_facilities( work ):
+    return [ parse_facility( row, runways ) for row, runways in work ]
+
+def facility_hash( row, runway_rows ):
+    # The effective date changes every cycle for every facility, so leave it out.
+    h = hashlib.sha1()
+    for r in [row[:3] + row[4:]] + runway_rows:
+        h.update( '\x1f'.join( r ).encode( 'utf-8' ) )
+        h.update( b'\x1e' )
+    return h.hexdigest()
+
+def load_previous():
+    #--------------------------------------------------------------
+    # Previous rawdata.dat and its manifest, or None if either is
+    # missing or was made by another PARSER_VERSION, in which case 
+    # we do a full build.
+    #--------------------------------------------------------------
+    if not os.path.exists( 'rawdata.dat' ) or not os.path.exists( 'rawdata.manifest' ): 
+        print( f'No previous rawdata.dat and rawdata.manifest, doing a full build' )
+        return None
+    f = open( 'rawdata.manifest', 'rb' )
+    prev_manifest = pickle.load( f )
+    f.close()
+    version = prev_manifest.get( 'version' )
+    if version != PARSER_VERSION:
+        print( f'Previous rawdata.manifest is from parser version {version}, not {PARSER_VERSION}, doing a full build' )
+        return None
+    f = open( 'rawdata.dat', 'rb' )
+    prev_rawdata = pickle.load( f )
+    f.close()
+    return (prev_rawdata, prev_manifest)
+
+def intern_keys( o ):
+    # Keys that come back from a worker are fresh copies rather than the interned
+    # literals used here.  Interning them again lets pickle share them the same way
+    # in both paths, so rawdata.dat comes out byte-for-byte the same.
+    if isinstance( o, dict ): return { sys.intern( k ): intern_keys( v ) for k, v in o.items() }
+    if isinstance( o, list ): return [ intern_keys( v ) for v in o ]
+    return o
 
 def read():
     print( f'Reading NfdcRunways.csv...' )
     runways = {}                
+    runway_rows = {}
     with open( 'NfdcRunways.csv', 'r' ) as csv_file:
         reader = csv.reader( csv_file )
         have_one = False
@@ -147,53 +374,127 @@ def read():
                        'condition':     row[5],
                        'pattern':       row[12],
                        'pattern_rcp':   row[46]}
-            if site not in runways: runways[site] = []
+            if site not in runways: 
+                runways[site] = []
+                runway_rows[site] = []
             runways[site].append( runway )
+            runway_rows[site].append( row )
         csv_file.close()
 
     print( f'Reading NfdcFacilities.csv...' )
+    rows = []
     with open( 'NfdcFacilities.csv', 'r' ) as csv_file:
         reader = csv.reader( csv_file )
         have_one = False
         for row in reader:
-            #--------------------------------------------------------------
-            # Get airport information that's available from these .csv files.
-            #--------------------------------------------------------------
             if not have_one:
                 # skip first line
                 have_one = True
                 continue
-            id = row[len(row)-2]
-            if id == '': id = row[2].replace( "'", "" )
-
-            rawdata[id] = { 'site':      row[0],
-                            'type':      row[1],
-                            'state':     row[6],
-                            'city':      row[10],
-                            'name':      row[11],
-                            'use':       row[13],
-                            'lat':       latlon_to_decimal( row[23] ),
-                            'lon':       latlon_to_decimal( row[25] ),
-                            'elevation': int(row[27]),
-                            'unicom_freq': row[73],
-                            'ctaf_freq': row[74],
-                            'runways':   runways[row[0]] if row[0] in runways else [] }
-
-            #--------------------------------------------------------------
-            # Download and parse more detailed information from faa.gov.
-            #--------------------------------------------------------------
-            parse_faa_text( id )
-
+            rows.append( row )
         csv_file.close()
 
+    #--------------------------------------------------------------
+    # In incremental mode, compare each facility (its .csv row plus
+    # runway rows) with the previous build's manifest and only redo 
+    # the ones that changed or appeared, plus unchanged ones whose
+    # faa.gov page was missing last time.  Dropped facilities simply
+    # don't make it into the new rawdata.  A previous build made by 
+    # another PARSER_VERSION is ignored.
+    #--------------------------------------------------------------
+    for row in rows:
+        manifest['hashes'][facility_id( row )] = facility_hash( row, runway_rows[row[0]] if row[0] in runway_rows else [] )
+    manifest['cycle'] = rows[0][3] if len( rows ) > 0 else ''
+    previous = load_previous() if incremental else None
+    if previous:
+        prev_rawdata, prev_manifest = previous
+        prev_hashes = prev_manifest['hashes']
+        redo = [ id for id in manifest['hashes'] if id not in prev_rawdata or prev_hashes.get( id ) != manifest['hashes'][id] ]
+        redo_ids = set( redo )
+        no_page = set( prev_manifest['no_page'] )
+        missing = [ id for id in manifest['hashes'] if id not in redo_ids and id in no_page ]
+        dropped = [ id for id in prev_hashes if id not in manifest['hashes'] ]
+        print( f'Cycle {prev_manifest["cycle"]} -> {manifest["cycle"]}: {len(redo)} new or changed, {len(missing)} missing faa.gov data, ' +
+               f'{len(dropped)} dropped, {len(manifest["hashes"])-len(redo)-len(missing)} unchanged' )
+        refetch = set( id for id in redo if id in prev_hashes ) | set( missing )
+        redo_ids |= refetch
+    else:
+        prev_rawdata = {}
+        redo_ids = set( manifest['hashes'] )
+        refetch = set()
+
+    #--------------------------------------------------------------
+    # Download more detailed information from faa.gov.
+    #--------------------------------------------------------------
+    fetch_faa_pages( [ id for id in dict.fromkeys( facility_id( row ) for row in rows ) if id in redo_ids ], refetch )
+
+    #--------------------------------------------------------------
+    # Parse each facility with its runways and faa.gov page.
+    # Chunks are handed out to worker processes and the results are 
+    # merged back in .csv order, so rawdata comes out exactly the same
+    # as when everything is parsed here.
+    #--------------------------------------------------------------
+    work = [ (row, runways[row[0]] if row[0] in runways else []) for row in rows if facility_id( row ) in redo_ids ]
+    chunks = [ work[i:i+parse_chunk] for i in range(0, len(work), parse_chunk) ]
+    print( f'Parsing {len(work)} facilities ({parse_jobs} jobs)...' )
+    if parse_jobs <= 1:
+        results = map( parse_facilities, chunks )
+    else:
+        pool = ProcessPoolExecutor( max_workers=parse_jobs )
+        results = pool.map( parse_facilities, chunks )
+    parsed = {}
+    for chunk in results:
+        for id, info in chunk:
+            parsed[id] = intern_keys( info ) if parse_jobs > 1 else info
+    if parse_jobs > 1: pool.shutdown()
+    for row in rows:
+        id = facility_id( row )
+        rawdata[id] = parsed[id] if id in parsed else intern_keys( prev_rawdata[id] )
+    manifest['no_page'] = [ id for id in rawdata if not os.path.exists( f'airports/{id}.faa.out' ) ]
+    add_magvar()
+    add_runway_summary()
+
+def add_magvar():
+    #--------------------------------------------------------------
+    # Magnetic variation (E positive) at each facility on the cycle's
+    # effective date, so ../fp.py doesn't have to compute it for named 
+    # airports.  It moves well under 0.1 degree in a 56-day cycle.
+    # Redone for every facility each build, including ones reused
+    # by an incremental build.
+    #--------------------------------------------------------------
+    if manifest['cycle'] == '': return
+    mm, dd, yy = [ int( x ) for x in manifest['cycle'].split( '/' ) ]
+    print( f'Computing magnetic variation for {manifest["cycle"]}...' )
+    dated = MagVar.model.at_yymmdd( yy, mm, dd )
+    ids = list( rawdata.keys() )
+    mvs = dated.declination_many( [ rawdata[id]['lat'] for id in ids ], [ rawdata[id]['lon'] for id in ids ] )
+    for id, mv in zip( ids, mvs ): rawdata[id]['magvar'] = mv
+
+def add_runway_summary():
+    #--------------------------------------------------------------
+    # Longest runways (any, hard-surface, turf), runway end headings
+    # and surface codes, so ../fp.py can read them instead of working
+    # them out for every query (see AirportStore.make_runway_summary).
+    # Redone for every facility each build, like the magvar.
+    #--------------------------------------------------------------
+    print( f'Summarizing runways...' )
+    for id in rawdata:
+        rawdata[id]['runway_summary'] = AirportStore.make_runway_summary( rawdata[id] )
+
 def write():
     print( f'Writing {len(rawdata)} entries to rawdata.dat...' )
     print( rawdata['KTTA'] )
     out = open( 'rawdata.dat', 'wb' )
     pickle.dump( rawdata, out )
     out.close()
+    print( f'Writing {len(rawdata)} entries to rawdata.col...' )
+    AirportStore.write( rawdata, 'rawdata.col' )
+    out = open( 'rawdata.manifest', 'wb' )
+    pickle.dump( manifest, out )
+    out.close()
 
 
-download()
-read()
-write()
+if __name__ == '__main__':
+    download()
+    read()
+    write()